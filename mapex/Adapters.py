@@ -1,5 +1,7 @@
 """ Модуль с адаптерами для подключения к СУБД """
 
+from time import monotonic
+
 from .Exceptions import AdapterException, DublicateRecordException
 from .Sql import Adapter, PgDbField, MySqlDbField, MsSqlDbField, AdapterLogger
 from .Mappers import FieldTypes
@@ -12,11 +14,15 @@ class NoTableFound(Exception):
 
 class PgSqlDbAdapter(Adapter):
     """ Адаптер для работы с PostgreSQL """
+    # Сколько подготовленных на сервере запросов держать открытыми для одного соединения
+    statements_cache_size = 256
+
     def __init__(self):
         import postgresql.exceptions
 
         super().__init__()
         self.dublicate_record_exception = postgresql.exceptions.UniqueError
+        self.statements = {}
 
     # noinspection PyMethodMayBeStatic
     def get_query_builder(self):
@@ -43,8 +49,16 @@ class PgSqlDbAdapter(Adapter):
 
     def close_connection(self):
         """ Закрывает соединение с базой данных """
+        # Подготовленные запросы принадлежат соединению и закрываются вместе с ним
+        self.statements.clear()
         self.connection.close()
 
+    def ping(self) -> bool:
+        """ Проверяет соединение запросом к серверу: флаг closed не замечает соединений, разорванных сервером """
+        if self.connection.closed:
+            return False
+        return super().ping()
+
     def execute_raw(self, sql):
         """
         Выполняет sql-сценарий. Неиспользует prepared statements
@@ -60,7 +74,7 @@ class PgSqlDbAdapter(Adapter):
         :param sql:         SQL-Запрос
         :param params:      Параметры для плейсхолдеров запроса
         """
-        statement = self.connection.prepare(sql)
+        statement = self.prepare(sql)
         *args, = params if params is not None else []
         try:
             for res in statement(*args):
@@ -68,7 +82,22 @@ class PgSqlDbAdapter(Adapter):
         except self.dublicate_record_exception as err:
             self.reconnect()
             raise DublicateRecordException(err)
-        statement.close()
+
+    def prepare(self, sql):
+        """
+        Возвращает подготовленный на сервере запрос. Запросы кэшируются по тексту, поэтому повторяющиеся запросы
+        не разбираются и не планируются сервером заново. Давно не использованные запросы закрываются
+        :param sql:         SQL-Запрос
+        :return:            Подготовленный запрос
+        """
+        statement = self.statements.pop(sql, None)
+        if statement is None:
+            statement = self.connection.prepare(sql)
+            if len(self.statements) >= self.statements_cache_size:
+                # Использованный запрос переставляется в конец словаря, поэтому первым в нем идет самый старый
+                self.statements.pop(next(iter(self.statements))).close()
+        self.statements[sql] = statement
+        return statement
 
     def get_table_fields(self, table_name):
         """
@@ -179,6 +208,14 @@ class MySqlDbAdapter(Adapter):
         """ Закрывает соединение с базой данных """
         self.connection.close()
 
+    def ping(self) -> bool:
+        """ Проверяет соединение командой протокола COM_PING, без разбора sql-запроса сервером """
+        try:
+            self.connection.ping()
+            return True
+        except self.lost_connection_error:
+            return False
+
     def execute_raw(self, sql):
         """
         Выполняет sql-сценарий. Неиспользует prepared statements
@@ -218,8 +255,10 @@ class MySqlDbAdapter(Adapter):
         try:
             cursor.execute(sql, params if params is not None else [])
             if cursor.with_rows:
-                for res in cursor:
-                    yield res
+                rows = cursor.fetchmany(self.fetch_size)
+                while rows:
+                    yield from rows
+                    rows = cursor.fetchmany(self.fetch_size)
             else:
                 yield cursor.lastrowid
         except self.dublicate_record_exception as err:
@@ -283,6 +322,10 @@ class MySqlDbAdapter(Adapter):
 
 class MsSqlDbAdapter(Adapter):
     """ Адаптер для работы с MSSQL """
+    # Ограничения сервера: не более 2100 параметров и не более 1000 строк в VALUES одного запроса
+    max_query_params = 2100
+    max_insert_rows = 1000
+
     def __init__(self):
         import pyodbc
 
@@ -334,8 +377,10 @@ class MsSqlDbAdapter(Adapter):
         if cursor.rowcount == 0:
             return
         elif cursor.rowcount == -1:
-            for res in cursor:
-                yield res
+            rows = cursor.fetchmany(self.fetch_size)
+            while rows:
+                yield from rows
+                rows = cursor.fetchmany(self.fetch_size)
         else:
             yield cursor.execute('''SELECT @@IDENTITY''').fetchone()
 
@@ -404,6 +449,7 @@ class MongoDbAdapter(AdapterLogger):
 
         super().__init__()
         self.db = None
+        self.connected_at = None
 
         self.dublicate_record_exception = pymongo.errors.DuplicateKeyError
         self.update_primary_exception = pymongo.errors.OperationFailure
@@ -417,6 +463,7 @@ class MongoDbAdapter(AdapterLogger):
 
         try:
             self.db = pymongo.MongoClient(connection_data[0], connection_data[1])[connection_data[2]]
+            self.connected_at = monotonic()
             return self
         except pymongo.errors.ConnectionFailure as e:
             if "[Errno 104]" in str(e):
@@ -427,6 +474,16 @@ class MongoDbAdapter(AdapterLogger):
         """ Закрывает соединение с базой данных """
         pass
 
+    def ping(self) -> bool:
+        """ Проверяет соединение служебной командой ping """
+        import pymongo.errors
+
+        try:
+            self.db.command("ping")
+            return True
+        except pymongo.errors.ConnectionFailure:
+            return False
+
     def count_query(self, collection_name: str, conditions: dict, joined_tables) -> int:
         """
         Выполняет запрос на подсчет строк в таблице по заданным условиям
@@ -459,6 +516,18 @@ class MongoDbAdapter(AdapterLogger):
         except self.dublicate_record_exception as err:
             raise DublicateRecordException(err)
 
+    def insert_many_query(self, collection_name: str, rows: list, primary_key, batch_size: int):
+        """
+        Выполняет вставку нескольких записей в коллекцию пачками по batch_size документов
+        @param collection_name: Имя коллекции
+        @type collection_name: str
+        @param rows: Список документов для вставки
+        @param primary_key: Первичный ключ коллекции
+        @param batch_size: Максимальное количество документов в одном запросе
+        """
+        for start in range(0, len(rows), batch_size):
+            self.insert_query(collection_name, rows[start:start + batch_size], primary_key)
+
     def select_query(self, collection_name: str, fields: list, conditions: dict, params=None):
         """
         Выполняет запрос на получение записей из базы
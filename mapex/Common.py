@@ -1,14 +1,16 @@
-
-from abc import abstractmethod
-
-
 class TrackChangesValue(object):
-    @abstractmethod
+    """
+    Базовый класс значений, отслеживающих собственные изменения
+    Проверяется через isinstance() на горячих путях конвертации, поэтому остаётся обычным классом без метакласса
+    """
     def is_changed(self):
         """ Возвращает признак того, изменился ли объект """
 
 
 class ValueInside(object):
-    @abstractmethod
+    """
+    Базовый класс объектов, хранящих значение внутри себя
+    Проверяется через isinstance() на горячих путях конвертации, поэтому остаётся обычным классом без метакласса
+    """
     def get_value(self):
-        """ Возвращает значение, хранящееся в объекте """
\ No newline at end of file
+        """ Возвращает значение, хранящееся в объекте """
@@ -4,9 +4,14 @@
 
 
 class DublicateRecordException(Exception):
+    """ Исключение при попытке добавить запись с уже существующим значением уникального ключа """
     pass
 
 
+# Имя без опечатки. Старое имя сохраняется для обратной совместимости
+DuplicateRecordException = DublicateRecordException
+
+
 class AdapterException(Exception):
     """ Исключение работы на уровне адаптера базы данных """
     pass
@@ -2,20 +2,55 @@
 import re
 import time
 import json
+import math
 from enum import Enum, EnumMeta
-from copy import deepcopy
+from copy import copy
 from datetime import datetime, date, time as dtime
 from abc import abstractmethod, ABCMeta
-from collections import OrderedDict
 from collections import defaultdict
+from functools import lru_cache
+from itertools import groupby
 from threading import RLock
+from types import MappingProxyType
+from operator import eq, ne, gt, ge, lt, le, is_
+from sys import intern
 
 
 from .Exceptions import TableModelException, TableMapperException, DublicateRecordException
-from .Models import RecordModel, TableModel, EmbeddedObject, EmbeddedObjectFactory
+from .Models import RecordModel, TableModel, TableModelCache, EmbeddedObject, EmbeddedObjectFactory
 from .Common import TrackChangesValue, ValueInside
 from .Sql import SqlBuilder
-from .Utils import partition
+from .Utils import chunks
+
+# Обращение к полю маппера в квадратных скобках: "[name]"
+_bracketed_name = re.compile(r"\[(.+?)\]")
+# Общий неизменяемый пустой словарь для не переданных условий и параметров выборки
+# (переводится в формат СУБД без копирования и не создается заново для каждого запроса)
+_empty_mapping = MappingProxyType({})
+# Версия карт мапперов: увеличивается при любом изменении карты любого маппера.
+# Переводы имен могут зависеть от карт связанных мапперов, поэтому их кэши сверяются с этой версией
+_maps_version = 0
+# Проверки операторов сравнения при фильтрации вложенных документов (значение документа, значение из условия)
+_document_operators = {
+    "in": lambda option, value: option in value,
+    "nin": lambda option, value: option not in value,
+    "e": eq, "ne": ne, "gt": gt, "gte": ge, "lt": lt, "lte": le,
+    "match": lambda option, value: option.find(value) != -1,
+}
+# Сколько скомпилированных выражений для оператора match хранить (шаблоны приходят из значений условий,
+# поэтому кэш ограничен и вытесняет давно не использованные)
+_match_patterns_size = 1024
+
+
+@lru_cache(maxsize=_match_patterns_size)
+def get_match_pattern(mask: str):
+    """
+    Возвращает регулярное выражение для шаблона оператора match, в котором * означает любую последовательность символов
+    @param mask: Шаблон
+    @type mask: str
+    @return: Скомпилированное регулярное выражение (mongodb принимает его в условиях как есть)
+    """
+    return re.compile("^%s$" % mask.replace("*", ".*"))
 
 
 class Primary(object):
@@ -37,14 +72,13 @@ class Primary(object):
         self.compound = False
         if name_in_db:
             self.db_primary_key = name_in_db
-            primary_candidates = list(filter(
-                lambda prop_name: self.mapper.get_property(prop_name).get_db_name() == name_in_db,
-                self.mapper.get_properties()
-            ))
-            self.primary = primary_candidates[0] if len(primary_candidates) > 0 else None
+            self.primary = next((
+                prop_name for prop_name in self.mapper.get_properties()
+                if self.mapper.get_property(prop_name).get_db_name() == name_in_db
+            ), None)
         elif name_in_mapper:
             self.primary = name_in_mapper
-            if type(name_in_mapper) is list:
+            if isinstance(name_in_mapper, list):
                 self.compound = True
             else:
                 self.db_primary_key = self.mapper.get_property(name_in_mapper).get_db_name()
@@ -53,6 +87,12 @@ class Primary(object):
         if self.db_primary_key and self.db_primary_key in self.mapper.db_fields.keys():
             self.autoincremented = self.mapper.db_fields.get(self.db_primary_key).autoincremented
 
+        # Вид ключа известен после инициализации, поэтому реализации извлечения значения выбираются один раз
+        if self.compound:
+            self.grab_value_from, self.eq_condition = self._grab_compound, self._grab_compound
+        else:
+            self.grab_value_from, self.eq_condition = self._grab_scalar, self._eq_condition_scalar
+
     def db_name(self):
         """ Возвращает имя ключа в базе данных
         @return: Имя поля, являющегося первичным ключом в базе данных
@@ -97,6 +137,16 @@ class Primary(object):
             else:
                 return data
 
+    def _grab_scalar(self, data):
+        """ Реализация grab_value_from для простого первичного ключа """
+        return data.get(self.primary) if isinstance(data, dict) else data
+
+    def _grab_compound(self, data):
+        """ Реализация grab_value_from (и eq_condition) для составного первичного ключа """
+        if isinstance(data, dict):
+            return {field: data.get(field) for field in self.primary}
+        raise TableMapperException("Invalid data for the compound primary")
+
     def eq_condition(self, data):
         """
         Возвращает словарь, представляющий собой первичный ключ
@@ -112,20 +162,36 @@ class Primary(object):
                 res = {self.name(): res}
         return res
 
+    def _eq_condition_scalar(self, data):
+        """ Реализация eq_condition для простого первичного ключа """
+        res = data.get(self.primary) if isinstance(data, dict) else data
+        return res if isinstance(res, dict) else {self.name(): res}
+
 
 def lazy_deep(data):
-    if isinstance(data, RecordModel):
-        data.exec_lazy_loading()
-        data.mark_as_changed()
-    elif isinstance(data, list):
-        [lazy_deep(v) for v in data]
-    elif isinstance(data, FieldValues.ListValue):
-        [lazy_deep(v) for v in data]
-    elif isinstance(data, dict):
-        for key, val in data.items():
-            if isinstance(val, FieldValues.ListValue):
-                data[key] = [v for v in val]
-            lazy_deep(val)
+    """
+    Выполняет отложенную загрузку всех моделей, вложенных в данные (на любую глубину), и помечает их измененными.
+    Списки значений (ListValue) внутри словарей заменяются обычными списками
+    Обход выполняется с явным стеком, поэтому глубина вложенности данных не ограничена глубиной рекурсии
+    @param data: Данные (модель, список или словарь)
+
+    """
+    stack = [data]
+    while stack:
+        data = stack.pop()
+        if isinstance(data, RecordModel):
+            data.exec_lazy_loading()
+            data.mark_as_changed()
+        elif isinstance(data, list):
+            # ListValue - тоже список. Элементы кладутся в обратном порядке, чтобы обходиться в исходном
+            stack.extend(reversed(data))
+        elif isinstance(data, dict):
+            values = []
+            for key, val in data.items():
+                if isinstance(val, FieldValues.ListValue):
+                    data[key] = list(val)
+                values.append(val)
+            stack.extend(reversed(values))
 
 
 class FieldTypes(object):
@@ -139,18 +205,34 @@ class FieldTypes(object):
         @param db_field_name: Имя поля в таблице базы данных
 
         """
+        # Полей у мапперов много, а набор их атрибутов фиксирован, поэтому экземпляры хранятся без __dict__.
+        # Все атрибуты, общие для разных ветвей иерархии (db_field_type из NoSqlBaseField), объявлены здесь,
+        # чтобы классы с несколькими базовыми классами не получали конфликта раскладки слотов
+        __slots__ = (
+            "mapper", "mapper_field_name", "db_field_name", "db_field_type",
+            "_hash", "_converters", "_to_mapper", "_to_database"
+        )
         ident = "BaseField"
 
+        # Типы значений, для которых тип-источник конвертации определяется одним поиском по словарю
+        # (подклассы этих типов проверяются через isinstance)
+        _source_types = {str: "String", datetime: "DateTime", date: "Date", bool: "Bool", float: "Float", int: "Int"}
+
         def __init__(self, mapper, mapper_field_name, **kwargs):
             self.mapper = mapper
             self.mapper_field_name = mapper_field_name
             self.db_field_name = kwargs.get("db_field_name")
+            # Поля используются как ключи словарей при каждой конвертации, поэтому хэш вычисляется один раз
+            self._hash = hash(mapper_field_name)
+            self._converters = None
+            self._to_mapper = None
+            self._to_database = None
 
         def __eq__(self, other):
-            return self.get_name() == other.get_name()
+            return isinstance(other, FieldTypes.BaseField) and self.mapper_field_name == other.mapper_field_name
 
         def __hash__(self):
-            return int("".join([str(ord(l)) for l in self.get_name()]))
+            return self._hash
 
         @abstractmethod
         def value_assertion(self, v) -> bool:
@@ -199,13 +281,7 @@ class FieldTypes(object):
             Возвращает тип поля маппера
             @return: Тип поля маппера
             """
-            db_type = self.get_db_type()
-            field_types = self.mapper.pool.db.get_field_types_map()
-            for mapperType in field_types:
-                if db_type in field_types[mapperType]:
-                    return mapperType
-            return FieldTypes.Unknown
-            #raise TableMapperException("Unknown database field type: %s" % db_type)
+            return self.mapper.pool.db.get_reverse_field_types_map().get(self.get_db_type(), FieldTypes.Unknown)
 
         def get_default_value(self):
             """
@@ -238,28 +314,85 @@ class FieldTypes(object):
             @return: Сконвертированное значение
 
             """
-            # noinspection PyDocstring
-            def try_convert(s, d):
+            if direction == "mapper2database":
+                return (self._to_database or self.get_to_database())(value, cache, save_unsaved, model_pool)
+            return (self._to_mapper or self.get_to_mapper())(value, cache, save_unsaved, model_pool)
+
+        def get_converters(self) -> tuple:
+            """
+            Возвращает типы поля и конвертеры значений для обоих направлений конвертации.
+            Тип поля в базе данных не меняется после инициализации маппера, поэтому конвертеры выбираются один раз
+            @return: (тип маппера, тип БД, конвертер mapper2database, конвертер database2mapper)
+            @rtype : tuple
+
+            """
+            mapper_ident, db_ident = self.get_mapper_type().ident, self.get_db_type_in_mapper_terms().ident
+            self._converters = (
+                mapper_ident, db_ident,
+                FieldTypesConverter.converters.get((mapper_ident, db_ident)),
+                FieldTypesConverter.converters.get((db_ident, mapper_ident))
+            )
+            return self._converters
+
+        def get_to_mapper(self):
+            """
+            Возвращает функцию конвертации значения из формата базы данных в формат маппера,
+            в которой уже связаны конвертер, само поле и проверка значения.
+            Вызывается для каждого значения каждой строки выборки, поэтому выбор конвертера делается один раз
+            @return: Функция вида f(value, cache, save_unsaved, model_pool=None)
+
+            """
+            if self._to_mapper is not None:
+                return self._to_mapper
+            mapper_ident, db_ident, to_database, converter = self._converters or self.get_converters()
+            field, check_value, none_value = self, self.check_value, FieldValues.NoneValue()
+
+            def to_mapper(value, cache, save_unsaved, model_pool=None):
                 try:
-                    return FieldTypesConverter.converters[(s, d)](value, self, cache, save_unsaved, model_pool)
+                    if converter is None:
+                        raise KeyError((db_ident, mapper_ident))
+                    converted = converter(value, field, cache, save_unsaved, model_pool)
                 except KeyError:
-                    raise TableMapperException("\ncan't convert value %s from %s to %s" % (value, s, d))
-
-            if direction == "mapper2database":
-                if isinstance(value, FieldValues.NoneValue) is False:
-                    self.check_value(value)
-                converted = try_convert(self.get_mapper_type().ident, self.get_db_type_in_mapper_terms().ident)
-                return converted if isinstance(converted, FieldValues.NoneValue) is False else None
-            else:
-                converted = try_convert(self.get_db_type_in_mapper_terms().ident, self.get_mapper_type().ident)
-                if isinstance(converted, FieldValues.NoneValue) is False:
-                    self.check_value(converted)
+                    raise TableMapperException("\ncan't convert value %s from %s to %s" % (value, db_ident, mapper_ident))
+                if converted is not none_value:
+                    check_value(converted)
                 return converted
 
+            self._to_mapper = to_mapper
+            return to_mapper
+
+        def get_to_database(self):
+            """
+            Возвращает функцию конвертации значения из формата маппера в формат базы данных
+            (пара к get_to_mapper: конвертер, поле и проверка значения связываются один раз)
+            @return: Функция вида f(value, cache, save_unsaved, model_pool=None)
+
+            """
+            if self._to_database is not None:
+                return self._to_database
+            mapper_ident, db_ident, converter, to_mapper = self._converters or self.get_converters()
+            field, check_value, none_value = self, self.check_value, FieldValues.NoneValue()
+
+            def to_database(value, cache, save_unsaved, model_pool=None):
+                if value is not none_value:
+                    check_value(value)
+                try:
+                    if converter is None:
+                        raise KeyError((mapper_ident, db_ident))
+                    converted = converter(value, field, cache, save_unsaved, model_pool)
+                except KeyError:
+                    raise TableMapperException("\ncan't convert value %s from %s to %s" % (value, mapper_ident, db_ident))
+                return converted if converted is not none_value else None
+
+            self._to_database = to_database
+            return to_database
+
         def cast_to_field_type(self, raw_value, model_pool):
-            source_type = None
+            source_type = self._source_types.get(type(raw_value))
 
-            if isinstance(raw_value, str):
+            if source_type:
+                pass
+            elif isinstance(raw_value, str):
                 source_type = "String"
             elif isinstance(raw_value, datetime):
                 source_type = "DateTime"
@@ -303,9 +436,8 @@ class FieldTypes(object):
                 return None
 
             if direction == "mapper2database":
-                if name.find(".") > -1:
-                    path = name.split(".")
-                    mapper_field_name, mapper_property = path[0], ".".join(path[1:])
+                if "." in name:
+                    mapper_field_name, mapper_property = name.split(".", 1)
                     linked_mapper = self.mapper.get_property(mapper_field_name).get_items_collection_mapper()
                     return "%s.%s" % (
                         mapper_field_name
@@ -316,10 +448,10 @@ class FieldTypes(object):
                     mapper_field = self.mapper.get_property(name)
                     return mapper_field.get_db_name() if mapper_field else name
             else:
-                if name.endswith("]"):
-                    return re.search("\[(.+?)\]", name).group(1)
+                if name[-1:] == "]":
+                    return _bracketed_name.search(name).group(1)
 
-                if name.find(".") > -1:
+                if "." in name:
                     table_name, field_name = name.split(".", 1)
                     mapper_property = self.mapper.get_property(table_name)
                     return '%s.%s' % (
@@ -329,6 +461,7 @@ class FieldTypes(object):
                 return self.mapper.get_property_by_db_name(name).get_name()
 
     class NoSqlBaseField(BaseField):
+        __slots__ = ()
 
         def __init__(self, mapper, mapper_field_name, **kwargs):
             super().__init__(mapper, mapper_field_name, **kwargs)
@@ -356,6 +489,7 @@ class FieldTypes(object):
     class Int(BaseField):
         """ Класс для представления целочисленного типа поля уровня маппера """
 
+        __slots__ = ()
         ident = "Int"
 
         def value_assertion(self, v) -> bool:
@@ -365,15 +499,19 @@ class FieldTypes(object):
             @rtype : bool
 
             """
+            if isinstance(v, int):
+                return not isinstance(v, bool)
+            # Целое число, записанное строкой (или объект, строковое представление которого - целое число)
             str_v = str(v)
             return str_v.isdigit() or str_v.startswith("-") and str_v[1:].isdigit()
 
     class NoSqlInt(Int, NoSqlBaseField):
-        pass
+        __slots__ = ()
 
     class String(BaseField):
         """ Класс для представления строкового типа поля уровня маппера """
 
+        __slots__ = ()
         ident = "String"
 
         def value_assertion(self, v) -> bool:
@@ -388,6 +526,7 @@ class FieldTypes(object):
     class Json(BaseField):
         """ Класс для представления json типа поля уровня маппера """
 
+        __slots__ = ()
         ident = "Json"
 
         def value_assertion(self, v) -> bool:
@@ -401,6 +540,7 @@ class FieldTypes(object):
 
     class Enum(BaseField):
         """ Класс для представления перечисляемого типа поля уровня маппера """
+        __slots__ = ("model",)
         ident = "Enum"
 
         def __init__(self, mapper, mapper_field_name, model: Enum, **kwargs):
@@ -414,6 +554,7 @@ class FieldTypes(object):
     class Bytes(BaseField):
         """ Класс для представления бинарного типа уровная маппера """
 
+        __slots__ = ()
         ident = "Bytes"
 
         def value_assertion(self, v) -> bool:
@@ -426,22 +567,26 @@ class FieldTypes(object):
             return isinstance(v, (bytes, bytearray))
 
     class NoSqlString(String, NoSqlBaseField):
-        pass
+        __slots__ = ()
 
     class NoSqlBytes(Bytes, NoSqlBaseField):
-        pass
+        __slots__ = ()
 
     class Repr(String):
+        __slots__ = ()
         ident = "Repr"
 
     class Unknown(String):
+        __slots__ = ()
         ident = "Unknown"
 
     class NoSqlUnknown(NoSqlString):
+        __slots__ = ()
         ident = "Unknown"
 
     class NoSqlObjectID(NoSqlBaseField, BaseField):
 
+        __slots__ = ()
         ident = "ObjectID"
 
         def value_assertion(self, v) -> bool:
@@ -456,6 +601,7 @@ class FieldTypes(object):
     class EmbeddedObject(BaseField):
         """ Класс для представления кастомного типа поля уровня маппера """
 
+        __slots__ = ("model",)
         ident = "EmbeddedObject"
 
         def __init__(self, mapper, mapper_field_name, model, **kwargs):
@@ -470,16 +616,11 @@ class FieldTypes(object):
             super().__init__(mapper, mapper_field_name, **kwargs)
             self.model = model
 
+        # Соответствие типов значений типам полей маппера (заполняется после определения FieldTypes)
+        value_types_map = {}
+
         def get_value_type_in_mapper_terms(self, value_type):
-            return {
-                int: FieldTypes.Int,
-                str: FieldTypes.String,
-                float: FieldTypes.Float,
-                date: FieldTypes.Date,
-                time: FieldTypes.Time,
-                datetime: FieldTypes.DateTime,
-                bool: FieldTypes.Bool
-            }.get(value_type)
+            return self.value_types_map.get(value_type)
 
         def value_assertion(self, v) -> bool:
             if not isinstance(v, EmbeddedObject):
@@ -496,20 +637,14 @@ class FieldTypes(object):
 
     class NoSqlEmbeddedObject(EmbeddedObject, NoSqlBaseField):
         """ Класс для представления кастомного типа поля уровня маппера """
-        def get_value_type_in_mapper_terms(self, value_type):
-            return {
-                int: FieldTypes.NoSqlInt,
-                str: FieldTypes.NoSqlString,
-                float: FieldTypes.NoSqlFloat,
-                date: FieldTypes.NoSqlDate,
-                time: FieldTypes.NoSqlTime,
-                datetime: FieldTypes.NoSqlDateTime,
-                bool: FieldTypes.NoSqlBool
-            }.get(value_type)
+
+        __slots__ = ()
+        value_types_map = {}
 
     class Bool(BaseField):
         """ Класс для представления булевого типа поля уровня маппера """
 
+        __slots__ = ()
         ident = "Bool"
 
         def value_assertion(self, v) -> bool:
@@ -522,11 +657,12 @@ class FieldTypes(object):
             return isinstance(v, bool)
 
     class NoSqlBool(Bool, NoSqlBaseField):
-        pass
+        __slots__ = ()
 
     class Float(BaseField):
         """ Класс для представления значений маппера с плавающей точкой """
 
+        __slots__ = ()
         ident = "Float"
 
         def value_assertion(self, v) -> bool:
@@ -539,11 +675,12 @@ class FieldTypes(object):
             return isinstance(v, float) or (isinstance(v, int) and int(float(v)) == v)
 
     class NoSqlFloat(Float, NoSqlBaseField):
-        pass
+        __slots__ = ()
 
     class Date(BaseField):
         """ Класс для представления дат маппера """
 
+        __slots__ = ()
         ident = "Date"
 
         def value_assertion(self, v) -> bool:
@@ -556,11 +693,12 @@ class FieldTypes(object):
             return isinstance(v, date)
 
     class NoSqlDate(Date, NoSqlBaseField):
-        pass
+        __slots__ = ()
 
     class Time(BaseField):
         """ Класс для представления полей маппера типа "Время" """
 
+        __slots__ = ()
         ident = "Time"
 
         def value_assertion(self, v) -> bool:
@@ -573,11 +711,12 @@ class FieldTypes(object):
             return isinstance(v, dtime)
 
     class NoSqlTime(Time, NoSqlBaseField):
-        pass
+        __slots__ = ()
 
     class DateTime(BaseField):
         """ Класс для представления полей маппера типа "Дата и время" """
 
+        __slots__ = ()
         ident = "DateTime"
 
         def value_assertion(self, v) -> bool:
@@ -590,13 +729,14 @@ class FieldTypes(object):
             return isinstance(v, datetime)
 
     class NoSqlDateTime(DateTime, NoSqlBaseField):
-        pass
+        __slots__ = ()
 
     ################################# Общие типы полей со связями ##################################################
 
     class RelationField(BaseField):
         """ Базовый класс для всех типов полей, являющихся связями с другими таблицами """
 
+        __slots__ = ("item_class", "items_collection_mapper", "_main_record_key", "_main_record_primary")
         ident = "Rel"
 
         def __init__(self, mapper, mapper_field_name, **kwargs):
@@ -614,6 +754,8 @@ class FieldTypes(object):
             item = kwargs.get("joined_collection")().get_new_item()
             self.item_class = item.__class__
             self.items_collection_mapper = item.mapper
+            self._main_record_key = None
+            self._main_record_primary = None
             if item.mapper.binded:
                 if item.mapper.primary.exists() is False and self.is_primary_required():
                     raise TableModelException("There is no primary key in %s" % item.mapper)
@@ -622,6 +764,29 @@ class FieldTypes(object):
         def is_primary_required():
             return True
 
+        @property
+        def main_record_key(self) -> str:
+            """
+            Имя поля привязанной коллекции, которое ссылается на основную запись.
+            Вычисляется при первом обращении, так как привязанный маппер может быть ещё не проинициализирован.
+            Имена ключей условий интернируются, чтобы все условия сохранения и очистки связей использовали один объект
+            """
+            if self._main_record_key is None:
+                self._main_record_key = intern(self.items_collection_mapper.get_property_that_is_link_for(
+                    self.mapper
+                ).get_name())
+            return self._main_record_key
+
+        @property
+        def main_record_primary(self) -> str:
+            """
+            Обращение к первичному ключу основной записи через поле привязанной коллекции (например, "user.id"),
+            используемое в условиях при сохранении и очистке связей. Вычисляется при первом обращении
+            """
+            if self._main_record_primary is None:
+                self._main_record_primary = intern("%s.%s" % (self.main_record_key, self.mapper.primary.name()))
+            return self._main_record_primary
+
         def get_new_item(self, model_pool=None):
             """
             Возвращает новый экземпляр класса значения для этого поля
@@ -646,6 +811,7 @@ class FieldTypes(object):
     class BaseLink(RelationField):
         """ Класс для типа поля маппера, реализующего связь один-ко-многим """
 
+        __slots__ = ()
         ident = "Link"
 
         def value_assertion(self, v):
@@ -658,6 +824,7 @@ class FieldTypes(object):
 
     class BaseList(RelationField):
 
+        __slots__ = ()
         ident = "List"
 
         def value_assertion(self, v):
@@ -667,9 +834,11 @@ class FieldTypes(object):
             @return: Результат проверки
 
             """
-            return isinstance(v, list) and len(list(filter(
-                lambda elem: isinstance(elem, self.item_class) is False, v
-            ))) == 0
+            if not isinstance(v, list):
+                return False
+            # Элементы списка почти всегда являются экземплярами ровно item_class, поэтому сначала сравнивается тип
+            item_class = self.item_class
+            return all(type(elem) is item_class or isinstance(elem, item_class) for elem in v)
 
         def get_default_value(self):
             """
@@ -680,6 +849,7 @@ class FieldTypes(object):
             return FieldValues.ListValue()
 
     class BaseForeignCollectionList(BaseList):
+        __slots__ = ()
 
         def save_items(self, items: list, main_record_obj: RecordModel, model_pool=None):
             """
@@ -690,11 +860,11 @@ class FieldTypes(object):
             @type main_record_obj: RecordModel
 
             """
-            main_record_key = self.items_collection_mapper.get_property_that_is_link_for(self.mapper).get_name()
+            main_record_key = self.main_record_key
             self.items_collection_mapper.update(
-                {"%s" % main_record_key: None},
-                {"%s.%s" % (main_record_key, self.mapper.primary.name()): main_record_obj.primary.get_value()},
-                model_pool=model_pool
+                {main_record_key: None},
+                {self.main_record_primary: main_record_obj.primary.get_value()},
+                model_pool=model_pool, return_ids=False
             )
             for obj in filter(None, items):
                 obj.__setattr__(main_record_key, main_record_obj)
@@ -710,14 +880,16 @@ class FieldTypes(object):
             @type main_records_ids: list
 
             """
-            main_record_key = self.items_collection_mapper.get_property_that_is_link_for(self.mapper).get_name()
-            self.items_collection_mapper.update(
-                {main_record_key: None},
-                {"%s.%s" % (main_record_key, self.mapper.primary.name()): ("in", main_records_ids)},
-                model_pool=model_pool
-            )
+            main_record_key = self.main_record_key
+            mapper = self.items_collection_mapper
+            for ids in chunks(main_records_ids, mapper.delete_chunk_size):
+                mapper.update(
+                    {main_record_key: None}, {self.main_record_primary: ("in", ids)},
+                    model_pool=model_pool, return_ids=False
+                )
 
     class BaseReversedLink(BaseList):
+        __slots__ = ()
         ident = "ReversedLink"
 
         def value_assertion(self, v):
@@ -746,11 +918,11 @@ class FieldTypes(object):
             @type main_record: RecordModel
 
             """
-            main_record_key = self.items_collection_mapper.get_property_that_is_link_for(self.mapper).get_name()
+            main_record_key = self.main_record_key
             self.items_collection_mapper.update(
-                {"%s" % main_record_key: None},
-                {"%s.%s" % (main_record_key, self.mapper.primary.name()): main_record.primary.get_value()},
-                model_pool=model_pool
+                {main_record_key: None},
+                {self.main_record_primary: main_record.primary.get_value()},
+                model_pool=model_pool, return_ids=False
             )
             if item:
                 item.__setattr__(main_record_key, main_record)
@@ -759,6 +931,7 @@ class FieldTypes(object):
                 item.save()
 
     class NoSqlRelationField(RelationField, NoSqlBaseField):
+        __slots__ = ()
 
         @abstractmethod
         def value_assertion(self, v) -> bool:
@@ -770,16 +943,18 @@ class FieldTypes(object):
             """
 
     class NoSqlBaseList(BaseList, NoSqlRelationField):
-        pass
+        __slots__ = ()
 
     ############################################# Sql ##############################################################
 
     class SqlLink(BaseLink):
-        pass
+        __slots__ = ()
 
     class SqlList(BaseList):
         """ Класс для типа поля маппера, реализующего связь многие-ко-многим """
 
+        __slots__ = ()
+
         def __init__(self, mapper, mapper_field_name, **kwargs):
             super().__init__(mapper, mapper_field_name, db_field_name="",
                              **kwargs)
@@ -803,6 +978,8 @@ class FieldTypes(object):
     class SqlListWithRelationsTable(SqlList, BaseForeignCollectionList):
         """ Класс для реализации отношений многие-ко-многим, использующих таблицу отношений записей """
 
+        __slots__ = ("rel_mapper", "_second_record_key")
+
         def __init__(self, mapper, mapper_field_name, **kwargs):
             """
             @param mapper: Маппер основной таблицы
@@ -816,6 +993,7 @@ class FieldTypes(object):
             """
             super().__init__(mapper, mapper_field_name, **kwargs)
             self.rel_mapper = kwargs.get("rel_mapper")()
+            self._second_record_key = None
             self.db_field_name = "%s.%s[%s]" % (
                 mapper_field_name,
                 self.items_collection_mapper.primary.db_name(),
@@ -831,13 +1009,13 @@ class FieldTypes(object):
             @type main_record_obj: RecordModel
 
             """
-            main_record_key = self.rel_mapper.get_property_that_is_link_for(self.mapper).get_name()
-            second_record_key = self.rel_mapper.get_property_that_is_link_for(self.items_collection_mapper).get_name()
-            self.rel_mapper.delete(
-                {"%s.%s" % (main_record_key, self.mapper.primary.name()): main_record_obj.primary.get_value()},
+            main_record_key, second_record_key = self.main_record_key, self.second_record_key
+            rel_mapper = self.rel_mapper
+            rel_mapper.delete(
+                {self.main_record_primary: main_record_obj.primary.get_value()},
                 model_pool=model_pool
             )
-            self.rel_mapper.insert(
+            rel_mapper.insert(
                 [{main_record_key: main_record_obj, second_record_key: obj} for obj in items],
                 model_pool=model_pool
             )
@@ -850,11 +1028,25 @@ class FieldTypes(object):
             @type main_records_ids: list
 
             """
-            main_record_key = self.rel_mapper.get_property_that_is_link_for(self.mapper).get_name()
-            self.rel_mapper.delete(
-                {"%s.%s" % (main_record_key, self.mapper.primary.name()): ("in", main_records_ids)},
-                model_pool=model_pool
-            )
+            mapper = self.rel_mapper
+            for ids in chunks(main_records_ids, mapper.delete_chunk_size):
+                mapper.delete({self.main_record_primary: ("in", ids)}, model_pool=model_pool)
+
+        @property
+        def main_record_key(self) -> str:
+            """ Имя поля таблицы отношений, которое ссылается на основную запись. Вычисляется один раз """
+            if self._main_record_key is None:
+                self._main_record_key = intern(self.rel_mapper.get_property_that_is_link_for(self.mapper).get_name())
+            return self._main_record_key
+
+        @property
+        def second_record_key(self) -> str:
+            """ Имя поля таблицы отношений, которое ссылается на привязанную запись. Вычисляется один раз """
+            if self._second_record_key is None:
+                self._second_record_key = intern(self.rel_mapper.get_property_that_is_link_for(
+                    self.items_collection_mapper
+                ).get_name())
+            return self._second_record_key
 
         def get_relations_mapper(self):
             """ Возвращает маппер таблицы отношений """
@@ -866,6 +1058,8 @@ class FieldTypes(object):
         но некое множество записей одной таблицы ссылаются на одну запись в основной таблице
         """
 
+        __slots__ = ()
+
         def __init__(self, mapper, mapper_field_name, **kwargs):
             """
             @param mapper: Маппер основной таблицы
@@ -877,23 +1071,20 @@ class FieldTypes(object):
 
             """
             super().__init__(mapper, mapper_field_name, **kwargs)
-            if self.items_collection_mapper.primary.compound:
+            # Имена полей первичного ключа в БД берутся прямо из полей маппера, без полного перевода через translate
+            items_mapper = self.items_collection_mapper
+            if items_mapper.primary.compound:
                 self.db_field_name = "%s.%s" % (
-                    self.items_collection_mapper.table_name,
+                    items_mapper.table_name,
                     "+".join([
-                        "%s[%s]" % (
-                            self.items_collection_mapper.translate(pf, "mapper2database"),
-                            mapper_field_name
-                        ) for pf in self.items_collection_mapper.primary.name()
+                        "%s[%s]" % (items_mapper.get_property(pf).get_db_name(), mapper_field_name)
+                        for pf in items_mapper.primary.name()
                     ])
                 )
             else:
                 self.db_field_name = "%s.%s[%s]" % (
                     mapper_field_name,
-                    self.items_collection_mapper.translate(
-                        self.items_collection_mapper.primary.name(),
-                        "mapper2database"
-                    ),
+                    items_mapper.get_property(items_mapper.primary.name()).get_db_name(),
                     mapper_field_name
                 )
 
@@ -910,6 +1101,8 @@ class FieldTypes(object):
         сконфигурированным без указания таблицы отношений, поэтому этот класс наследует классу List
 
         """
+
+        __slots__ = ()
         def __init__(self, mapper, mapper_field_name, **kwargs):
             """
             @param mapper: Маппер основной таблицы
@@ -932,6 +1125,8 @@ class FieldTypes(object):
                 )
 
     class SqlEmbeddedLink(BaseReversedLink, SqlListWithoutRelationsTable):
+        __slots__ = ()
+
         def save_items(self, item: RecordModel, main_record: RecordModel, model_pool=None):
             """
             Сохраняет все привязанные к основному объекту объекты
@@ -946,9 +1141,9 @@ class FieldTypes(object):
 
             lazy_deep(old_stored_data)
 
-            main_record_key = self.items_collection_mapper.get_property_that_is_link_for(self.mapper).get_name()
+            main_record_key = self.main_record_key
             self.items_collection_mapper.delete(
-                {"%s.%s" % (main_record_key, self.mapper.primary.name()): main_record.primary.get_value()},
+                {self.main_record_primary: main_record.primary.get_value()},
                 model_pool=model_pool
             )
 
@@ -970,13 +1165,12 @@ class FieldTypes(object):
             @type main_records_ids: list
 
             """
-            main_record_key = self.items_collection_mapper.get_property_that_is_link_for(self.mapper).get_name()
-            self.items_collection_mapper.delete(
-                {"%s.%s" % (main_record_key, self.mapper.primary.name()): ("in", main_records_ids)},
-                model_pool=model_pool
-            )
+            mapper = self.items_collection_mapper
+            for ids in chunks(main_records_ids, mapper.delete_chunk_size):
+                mapper.delete({self.main_record_primary: ("in", ids)}, model_pool=model_pool)
 
     class SqlEmbeddedList(SqlListWithoutRelationsTable):
+        __slots__ = ()
 
         def save_items(self, items: list, main_record_obj: RecordModel, model_pool=None):
             """
@@ -992,16 +1186,23 @@ class FieldTypes(object):
             old_stored_data = {id(item): item.get_data() for item in items}
             lazy_deep(old_stored_data)
 
-            main_record_key = self.items_collection_mapper.get_property_that_is_link_for(self.mapper).get_name()
-            self.items_collection_mapper.delete(
-                {"%s.%s" % (main_record_key, self.mapper.primary.name()): main_record_obj.primary.get_value()},
+            main_record_key = self.main_record_key
+            items_mapper = self.items_collection_mapper
+            items_mapper.delete(
+                {self.main_record_primary: main_record_obj.primary.get_value()},
                 model_pool=model_pool
             )
 
+            # Параметры первичного ключа привязанной коллекции одинаковы для всех элементов списка
+            autoincremented = items_mapper.primary.autoincremented
+            primary_name = items_mapper.primary.name() if autoincremented else None
+            none_value = FieldValues.NoneValue()
+
             #TODO сохранение списка не работает в MsSql из-за записи в первичный ключ
+            copies = []
             for obj in filter(None, items):
-                if self.items_collection_mapper.primary.autoincremented:
-                    obj.primary.set_value(FieldValues.NoneValue())
+                if autoincremented:
+                    obj.primary.set_value(none_value)
                 item_data = old_stored_data.get(id(obj))
                 item_data[main_record_key] = main_record_obj
                 copy = obj.get_new_collection().get_new_item()
@@ -1011,11 +1212,15 @@ class FieldTypes(object):
                 # Раз это EmbeddedList, то можно и терять значение AI поля - оно не должно быть важным.
 
                 # P.S. 16.10.2014 - на MSSQL вроде все работает. Надо приглядеться к MySQL
-                if self.items_collection_mapper.primary.autoincremented:
-                    item_data = {f: item_data[f] for f in item_data if f != self.items_collection_mapper.primary.name()}
+                if autoincremented:
+                    item_data = {f: item_data[f] for f in item_data if f != primary_name}
 
                 copy.load_from_array(item_data)
-                copy.save()
+                copies.append(copy)
+
+            # Элементы списка добавляются одной вставкой коллекции, а не сохранением каждой копии по отдельности
+            if copies:
+                copies[0].get_new_collection().save_new_items(copies)
 
         def clear_dependencies_from(self, main_records_ids: list, model_pool=None):
             """
@@ -1025,21 +1230,20 @@ class FieldTypes(object):
             @type main_records_ids: list
 
             """
-            main_record_key = self.items_collection_mapper.get_property_that_is_link_for(self.mapper).get_name()
-            self.items_collection_mapper.delete(
-                {"%s.%s" % (main_record_key, self.mapper.primary.name()): ("in", main_records_ids)},
-                model_pool=model_pool
-            )
+            mapper = self.items_collection_mapper
+            for ids in chunks(main_records_ids, mapper.delete_chunk_size):
+                mapper.delete({self.main_record_primary: ("in", ids)}, model_pool=model_pool)
 
     ############################################## NoSql ###########################################################
 
     class NoSqlLink(BaseLink, NoSqlRelationField):
-        pass
+        __slots__ = ()
 
     class NoSqlList(BaseList, NoSqlRelationField):
-        pass
+        __slots__ = ()
 
     class NoSqlReversedList(NoSqlList, BaseForeignCollectionList):
+        __slots__ = ()
 
         def __init__(self, mapper, mapper_field_name, **kwargs):
             """
@@ -1055,6 +1259,7 @@ class FieldTypes(object):
             self.db_field_name = mapper_field_name
 
     class NoSqlReversedLink(BaseReversedLink, NoSqlReversedList):
+        __slots__ = ()
         ident = "ReversedLink"
 
         def __init__(self, mapper, mapper_field_name, **kwargs):
@@ -1078,6 +1283,7 @@ class FieldTypes(object):
                 )
 
     class NoSqlEmbeddedDocument(NoSqlRelationField):
+        __slots__ = ()
         ident = "EmbeddedDocument"
 
         @abstractmethod
@@ -1089,6 +1295,7 @@ class FieldTypes(object):
             """
 
     class NoSqlEmbeddedLink(NoSqlEmbeddedDocument):
+        __slots__ = ()
         ident = "EmbeddedLink"
 
         def value_assertion(self, v):
@@ -1104,6 +1311,7 @@ class FieldTypes(object):
             return False
 
     class NoSqlEmbeddedList(BaseList, NoSqlEmbeddedDocument):
+            __slots__ = ()
             ident = "EmbeddedList"
 
             @staticmethod
@@ -1111,18 +1319,84 @@ class FieldTypes(object):
                 return False
 
 
+FieldTypes.EmbeddedObject.value_types_map = {
+    int: FieldTypes.Int,
+    str: FieldTypes.String,
+    float: FieldTypes.Float,
+    date: FieldTypes.Date,
+    time: FieldTypes.Time,
+    datetime: FieldTypes.DateTime,
+    bool: FieldTypes.Bool
+}
+FieldTypes.NoSqlEmbeddedObject.value_types_map = {
+    int: FieldTypes.NoSqlInt,
+    str: FieldTypes.NoSqlString,
+    float: FieldTypes.NoSqlFloat,
+    date: FieldTypes.NoSqlDate,
+    time: FieldTypes.NoSqlTime,
+    datetime: FieldTypes.NoSqlDateTime,
+    bool: FieldTypes.NoSqlBool
+}
+
+# Роли полей маппера в виде битовых флагов. Классы полей созданы через ABCMeta, и каждая проверка isinstance
+# проходит через ABCMeta.__instancecheck__, поэтому набор ролей вычисляется один раз для каждого класса поля
+ROLE_REL = 1
+ROLE_LINK = 2
+ROLE_LIST = 4
+ROLE_FOREIGN_COLLECTION_LIST = 8
+ROLE_REVERSED_LINK = 16
+ROLE_REAL_EMBEDDED = 32
+ROLE_EMBEDDED_OBJECT = 64
+
+_field_role_types = (
+    (ROLE_REL, FieldTypes.RelationField),
+    (ROLE_LINK, FieldTypes.BaseLink),
+    (ROLE_LIST, FieldTypes.BaseList),
+    (ROLE_FOREIGN_COLLECTION_LIST, FieldTypes.BaseForeignCollectionList),
+    (ROLE_REVERSED_LINK, FieldTypes.BaseReversedLink),
+    (ROLE_REAL_EMBEDDED, FieldTypes.NoSqlEmbeddedDocument),
+    (ROLE_EMBEDDED_OBJECT, FieldTypes.EmbeddedObject),
+)
+_field_roles = {}
+
+
+def get_field_class_roles(cls) -> int:
+    """
+    Возвращает битовую маску ролей для класса поля маппера
+    @param cls: Класс поля маппера (или любой другой класс - для него маска будет пустой)
+    @return: Битовая маска из флагов ROLE_*
+    @rtype : int
+
+    """
+    roles = _field_roles.get(cls)
+    if roles is None:
+        roles = 0
+        for role, field_type in _field_role_types:
+            if issubclass(cls, field_type):
+                roles |= role
+        _field_roles[cls] = roles
+    return roles
+
+
 class Joins(object):
     def __init__(self):
-        self._joins = OrderedDict()
+        self._joins = {}
 
     def add(self, join):
         self._joins[join.alias] = join
 
+    def get(self, alias):
+        """ Возвращает сам джойн (без копирования) - его нельзя изменять """
+        return self._joins.get(alias)
+
     def get_by_alias(self, alias):
-        return deepcopy(self._joins.get(alias))
+        # Все атрибуты джойна - строки, поэтому для независимой копии достаточно поверхностного копирования
+        return copy(self._joins.get(alias))
 
 
 class Join(object):
+    __slots__ = ("alias", "target_table_name", "target_table_field_name", "foreign_table_name", "foreign_table_field_name")
+
     def __init__(self, alias, target_table_name, target_table_field_name, foreign_table_name, foreign_table_field_name):
         self.alias = alias
         self.target_table_name = target_table_name
@@ -1130,22 +1404,56 @@ class Join(object):
         self.foreign_table_name = foreign_table_name
         self.foreign_table_field_name = foreign_table_field_name
 
+    def through(self, alias: str):
+        """
+        Возвращает новый джойн, выполняемый через присоединенную под алиасом alias таблицу
+        (сам джойн не изменяется, так как мапперы отдают свои джойны без копирования)
+        @param alias: Алиас таблицы, через которую выполняется джойн
+        @type alias: str
+        @return: Новый джойн
+        @rtype : Join
+        """
+        return Join(
+            "%s_%s" % (alias, self.alias), alias, self.target_table_field_name,
+            self.foreign_table_name, self.foreign_table_field_name
+        )
+
+    def key(self):
+        """ Возвращает кортеж, однозначно определяющий джойн """
+        return (
+            self.alias, self.target_table_name, self.target_table_field_name,
+            self.foreign_table_name, self.foreign_table_field_name
+        )
+
     def stringify_condition(self, builder: SqlBuilder):
         """ """
-        return "(%s.%s = %s.%s)" % (
-            builder.wrap_table(self.target_table_name),
-            builder.wrap_field(self.target_table_field_name),
-            builder.wrap_table(self.alias),
-            builder.wrap_field(self.foreign_table_field_name)
-        )
+        key = (type(builder), self.key())
+        condition = _rendered_join_conditions.get(key)
+        if condition is None:
+            condition = _rendered_join_conditions[key] = "(%s.%s = %s.%s)" % (
+                builder.wrap_table(self.target_table_name),
+                builder.wrap_field(self.target_table_field_name),
+                builder.wrap_table(self.alias),
+                builder.wrap_field(self.foreign_table_field_name)
+            )
+        return condition
 
     def stringify(self, builder: SqlBuilder):
         """ """
-        return "LEFT JOIN %s as %s ON %s" % (
-            builder.wrap_table(self.foreign_table_name),
-            builder.wrap_table(self.alias),
-            self.stringify_condition(builder)
-        )
+        key = (type(builder), self.key())
+        join = _rendered_joins.get(key)
+        if join is None:
+            join = _rendered_joins[key] = "LEFT JOIN %s as %s ON %s" % (
+                builder.wrap_table(self.foreign_table_name),
+                builder.wrap_table(self.alias),
+                self.stringify_condition(builder)
+            )
+        return join
+
+# Обрамление имен кавычками зависит только от класса построителя запросов, поэтому SQL-фрагменты джойнов
+# одинаковы для всех запросов и кэшируются по классу построителя и параметрам джойна
+_rendered_joins = {}
+_rendered_join_conditions = {}
 
 _new_lock = RLock()
 _init_lock = RLock()
@@ -1163,6 +1471,10 @@ class SqlMapper(metaclass=ABCMeta):
     binded = False
 
     def __new__(cls, *a, **kwa):
+        # Маппер запрашивается при создании каждой модели, поэтому уже созданный экземпляр отдаётся без блокировки
+        instance = cls._instance
+        if instance is not None:
+            return instance
         with _new_lock:
             if cls._instance is None:
                 # noinspection PyBroadException
@@ -1184,8 +1496,22 @@ class SqlMapper(metaclass=ABCMeta):
     dublicate_record_exception = DublicateRecordException
     item_class = RecordModel
     item_collection_class = TableModel
+    # Максимальное количество первичных ключей в одном запросе догрузки связанных моделей
+    # (None - все ключи одним запросом в пределах ограничения адаптера на количество параметров запроса)
+    batch_fetch_size = None
+    # Максимальное количество записей в одном запросе insert_many()
+    bulk_insert_size = 1000
+    # Максимальное количество первичных ключей в условии IN одного запроса очистки зависимых записей
+    delete_chunk_size = 1000
+    # Сколько различных наборов полей запоминать в кэше джойнов (get_joins)
+    joins_cache_size = 256
+    # Сколько различных наборов ключей словарей запоминать в кэше планов конвертации (get_dict_plan)
+    dict_plans_cache_size = 256
 
     def __init__(self):
+        # binded выставляется только по окончании инициализации, поэтому без блокировки её можно пропустить лишь тогда
+        if self.__class__._inited and self.binded:
+            return
         with _init_lock:
             if not self.__class__._inited:
                 for dep in self.__class__.dependencies:
@@ -1198,6 +1524,22 @@ class SqlMapper(metaclass=ABCMeta):
                 self.boundaries = None
                 self._properties = {}
                 self._joined = Joins()
+                self._joins_by_prop = {}
+                self._list_fields = frozenset()
+                self._dependent_list_fields = ()
+                self._links_for = {}
+                self._properties_by_path = {}
+                self._translations = {}
+                self._mapper_fields = {}
+                self._dict_plans = {}
+                self._joins_cache = {}
+                self._caches_version = -1
+                # Обработчики translate_and_convert по точному типу значения (методы могут быть переопределены)
+                self._converters_by_type = {
+                    list: self._translate_and_convert_list,
+                    dict: self._translate_and_convert_dict,
+                    str: self._translate_and_convert_str,
+                }
                 self._reversed_map = {}
                 self.is_mock = False
                 self.binded = False
@@ -1327,9 +1669,13 @@ class SqlMapper(metaclass=ABCMeta):
         @type field: FieldTypes.BaseField
 
         """
-        self._properties[field.get_name()] = field
-        self.primary = Primary(self, name_in_db=self.db_primary_key)
-        self._analyze_map()
+        name = field.get_name()
+        replaced = name in self._properties
+        self._properties[name] = field
+        # Первичный ключ пересоздается, только если новое поле может изменить его определение
+        if field.get_db_name() == self.db_primary_key or self.primary.primary == name:
+            self.primary = Primary(self, name_in_db=self.db_primary_key)
+        self._analyze_map(None if replaced else field)
 
     def set_primary(self, field_name):
         """
@@ -1373,14 +1719,25 @@ class SqlMapper(metaclass=ABCMeta):
         """
         self.boundaries = boundaries
 
-    def _analyze_map(self):
+    def _analyze_map(self, added_field: FieldTypes.BaseField=None):
         """
         Анализирует имеющуюся информацию и
         а) создает обратную версию карты маппинга (Поля базы -> поля маппера)
         б) создает обратную версию карты маппинга (Имена внешних таблиц базы -> поля маппера)
         б) создает карту join'ов маппера и других таблиц
-
-        """
+        @param added_field: Новое поле маппера, если карта изменилась только его добавлением
+        @type added_field: FieldTypes.BaseField
+
+        """
+        global _maps_version
+        _maps_version += 1
+        self._links_for = {}
+        self._properties_by_path = {}
+        # Добавленное простое поле не влияет на джойны, поэтому при поочередном добавлении полей (set_field)
+        # в карту вносится только оно, а не перестраивается вся карта
+        if added_field is not None and not isinstance(added_field, FieldTypes.RelationField):
+            self._reversed_map[added_field.get_db_name()] = added_field
+            return
         self._joined = Joins()
         self._reversed_map = {}
         for mapperFieldName in self._properties:
@@ -1401,6 +1758,23 @@ class SqlMapper(metaclass=ABCMeta):
                 else:
                     self.link_mappers(self, cm, mapper_field.get_db_name(), cm.db_primary_key, mapper_field.get_name())
 
+        # Индекс джойнов, необходимых для обращения через каждое поле-связь (используется в get_joins при каждой выборке)
+        self._joins_by_prop = {}
+        for mapperFieldName in self._properties:
+            mapper_field = self._properties[mapperFieldName]
+            if isinstance(mapper_field, FieldTypes.RelationField):
+                aliases = [mapperFieldName]
+                if isinstance(mapper_field, FieldTypes.SqlListWithRelationsTable):
+                    aliases.insert(0, mapper_field.get_relations_mapper().table_name)
+                self._joins_by_prop[mapperFieldName] = list(filter(None, map(self._joined.get, aliases)))
+
+        # Имена полей-списков и списков с зависимыми записями (используются при каждом сохранении и удалении записей).
+        # Все такие поля - связи, поэтому добавление простого поля (см. выше) эти наборы не меняет
+        self._list_fields = frozenset(name for name in self._properties if self.get_roles(name) & ROLE_LIST)
+        self._dependent_list_fields = tuple(
+            name for name in self._properties if self.get_roles(name) & ROLE_FOREIGN_COLLECTION_LIST
+        )
+
     def link_mappers(self, first_mapper, second_mapper, first_key, second_key, alias):
         self._joined.add(
             Join(
@@ -1419,6 +1793,16 @@ class SqlMapper(metaclass=ABCMeta):
         """
         return list(self._properties.keys())
 
+    def has_property(self, name: str) -> bool:
+        """
+        Проверяет, есть ли у маппера публично доступное свойство с указанным именем
+        @param name: Имя свойства
+        @type name: str
+        @rtype : bool
+
+        """
+        return name in self._properties
+
     def get_property(self, field_name: str) -> FieldTypes.BaseField:
         """
         Возвращаеет поле маппера по его имени
@@ -1428,12 +1812,25 @@ class SqlMapper(metaclass=ABCMeta):
         @rtype : FieldTypes.BaseField
 
         """
-        if field_name.find(".") > -1:
-            path = field_name.split(".")
-            first, tale = path[0], ".".join(path[1:])
+        if "." not in field_name:
+            return self._properties.get(field_name)
+        prop = self._properties_by_path.get(field_name)
+        if prop is not None:
+            return prop
+        # Проходим по цепочке связей (например, user.account.name), отделяя по одному имени без построения списков
+        mapper, tail, bound = self, field_name, self.binded
+        while True:
+            first, dot, tail = tail.partition(".")
+            if not dot:
+                prop = mapper.get_property(first)
+                break
             # noinspection PyUnresolvedReferences
-            return self.get_property(first).get_items_collection_mapper().get_property(tale)
-        return self._properties.get(field_name)
+            mapper = mapper.get_property(first).get_items_collection_mapper()
+            bound = bound and mapper.binded
+        # Запоминаем результат, только если все мапперы цепочки уже полностью проинициализированы
+        if bound and prop is not None:
+            self._properties_by_path[field_name] = prop
+        return prop
 
     def get_property_by_db_name(self, db_name: str) -> FieldTypes.BaseField:
         """
@@ -1454,16 +1851,31 @@ class SqlMapper(metaclass=ABCMeta):
         @rtype : FieldTypes.BaseField
 
         """
+        # Найденные поля запоминаются до следующего изменения карты маппера (см. _analyze_map)
+        link = self._links_for.get(foreign_mapper)
+        if link is not None:
+            return link
         for prop in self.get_properties():
             prop = self.get_property(prop)
             if self.is_rel(prop):
                 # noinspection PyUnresolvedReferences
                 if prop.get_items_collection_mapper() == foreign_mapper:
+                    self._links_for[foreign_mapper] = prop
                     return prop
 
+    def _reset_derived_caches(self):
+        """
+        Сбрасывает кэши, которые зависят от карт связанных мапперов (переводы имен, поля по обращениям, джойны),
+        если карта какого-либо маппера изменилась с момента их заполнения
+        """
+        self._translations, self._mapper_fields, self._joins_cache = {}, {}, {}
+        self._dict_plans = {}
+        self._caches_version = _maps_version
+
     def get_joins(self, fields: list=None) -> []:
         """
         Возвращает часть словаря _joined, оставив только те таблицы, которые используются в fields
+        Набор джойнов зависит только от набора полей, поэтому для повторяющихся запросов он берется из кэша
         @param fields: Список полей
         @type fields: list
         @return: Список Join'ов
@@ -1473,35 +1885,51 @@ class SqlMapper(metaclass=ABCMeta):
         if not fields:
             return []
 
-        # Определяем список полей, запрашиваемых "через уровень", то есть с помощью двух джойнов
+        key = tuple(fields)
+        if self._caches_version == _maps_version:
+            joins = self._joins_cache.get(key)
+            if joins is not None:
+                return list(joins)
+        else:
+            self._reset_derived_caches()
+
+        joins = self._find_joins(fields)
+        if self.binded:
+            if len(self._joins_cache) >= self.joins_cache_size:
+                self._joins_cache.clear()
+            self._joins_cache[key] = tuple(joins)
+        return joins
+
+    def _find_joins(self, fields: list) -> []:
+        """ Собирает джойны, необходимые для обращения к полям fields (см. get_joins) """
+        # Определяем свойства-связи маппера, через которые идут обращения к другим свойствам (только они имеют смысл),
+        # и список полей, запрашиваемых "через уровень", то есть с помощью двух джойнов.
+        # Отбор, проверка типа и устранение повторов выполняются за один проход по полям
+        joins_by_prop = self._joins_by_prop
+        props = {}
         proxy_fields = defaultdict(list)
-        for pf in list(filter(lambda f: len(f.split(".")) > 2, fields)):
-            proxy_fields[pf.split(".")[0]].append(".".join(pf.split(".")[1:]))
-
-        # Определяем список свойств маппера, через которые идут обращения к другим свойствам (только они имеют смысл)
-        fields = [f.split(".")[0] for f in fields if f.find(".") > -1 or self.is_list(self.get_property(f))]
-        props = list(set(filter(lambda p: self.is_rel(p), [self.get_property(f) for f in fields])))
+        for f in fields:
+            name, dot, tail = f.partition(".")
+            if name not in joins_by_prop:
+                continue
+            if dot:
+                props[name] = joins_by_prop[name]
+                if "." in tail:
+                    proxy_fields[name].append(tail)
+            elif self.get_roles(name) & ROLE_LIST:
+                props[name] = joins_by_prop[name]
 
         joined_directly = []    # Непосредственные джойны к основному мапперу
         proxy_joins = []        # Джойны к присоединенным к основному мапперу таблицам
 
-        for prop in props:
-            # Если идет обращение к сущности (м-к-м через таблицу связей), добавляем джойн таблицы связей:
-            if isinstance(prop, FieldTypes.SqlListWithRelationsTable):
-                dj1 = self._joined.get_by_alias(prop.get_relations_mapper().table_name)
-                if dj1:
-                    joined_directly.append(dj1)
-
-            # Добавляем в список непосредственный джойн сущности, на которую смотрит поле маппера:
-            dj = self._joined.get_by_alias(prop.get_name())
-            if dj:
-                joined_directly.append(dj)
+        for name, direct_joins in props.items():
+            # Непосредственные джойны сущности, на которую смотрит поле маппера (и таблицы связей для м-к-м).
+            # Они не изменяются при построении запроса, поэтому отдаются без копирования
+            joined_directly.extend(direct_joins)
 
             # Обрабатываем джойны, получаемые из присоединенных непосредственно сущностей, если такие имеются:
-            for proxy_join in prop.items_collection_mapper.get_joins(proxy_fields.get(prop.get_name())):
-                proxy_join.alias = "%s_%s" % (prop.get_name(), proxy_join.alias)
-                proxy_join.target_table_name = prop.get_name()
-                proxy_joins.append(proxy_join)
+            for proxy_join in self._properties[name].items_collection_mapper.get_joins(proxy_fields.get(name)):
+                proxy_joins.append(proxy_join.through(name))
 
         return joined_directly + proxy_joins
 
@@ -1534,30 +1962,42 @@ class SqlMapper(metaclass=ABCMeta):
         """
         return mf if isinstance(mf, FieldTypes.BaseField) else self._properties.get(mf)
 
+    def get_roles(self, mf: str or FieldTypes.BaseField) -> int:
+        """
+        Возвращает битовую маску ролей поля маппера (см. ROLE_*)
+        @param mf: Имя поля маппера или объект поля маппера
+        @type mf: str or FieldTypes.BaseField
+        @return: Битовая маска ролей (0 - если такого поля нет)
+        @rtype : int
+
+        """
+        if mf.__class__ is str:
+            mf = self._properties.get(mf)
+        return get_field_class_roles(mf.__class__)
+
     def is_rel(self, mf: FieldTypes.BaseField) -> bool:
-        mf = self.prop_wrap(mf)
-        return isinstance(mf, FieldTypes.RelationField)
+        return self.get_roles(mf) & ROLE_REL != 0
 
     def is_link(self, mf: FieldTypes.BaseField) -> bool:
-        return isinstance(self.prop_wrap(mf), FieldTypes.BaseLink)
+        return self.get_roles(mf) & ROLE_LINK != 0
 
     def is_list(self, mf: FieldTypes.BaseField) -> bool:
-        return isinstance(self.prop_wrap(mf), FieldTypes.BaseList)
+        return self.get_roles(mf) & ROLE_LIST != 0
 
     def is_list_with_dependencies(self, mf: FieldTypes.BaseField) -> bool:
-        return isinstance(self.prop_wrap(mf), FieldTypes.BaseForeignCollectionList)
+        return self.get_roles(mf) & ROLE_FOREIGN_COLLECTION_LIST != 0
 
     def is_reversed_list(self, mf: FieldTypes.BaseField) -> bool:
-        return isinstance(self.prop_wrap(mf), FieldTypes.BaseForeignCollectionList)
+        return self.get_roles(mf) & ROLE_FOREIGN_COLLECTION_LIST != 0
 
     def is_reversed_link(self, mf: FieldTypes.BaseField) -> bool:
-        return isinstance(self.prop_wrap(mf), FieldTypes.BaseReversedLink)
+        return self.get_roles(mf) & ROLE_REVERSED_LINK != 0
 
     def is_real_embedded(self, mf: FieldTypes.BaseField) -> bool:
-        return isinstance(self.prop_wrap(mf), FieldTypes.NoSqlEmbeddedDocument)
+        return self.get_roles(mf) & ROLE_REAL_EMBEDDED != 0
 
     def is_embedded_object(self, mf: FieldTypes.BaseField) -> bool:
-        return isinstance(self.prop_wrap(mf), FieldTypes.EmbeddedObject)
+        return self.get_roles(mf) & ROLE_EMBEDDED_OBJECT != 0
 
     @staticmethod
     def is_none_value(value) -> bool:
@@ -1578,18 +2018,23 @@ class SqlMapper(metaclass=ABCMeta):
     ############################################ CRUD ###############################################################
 
     def get_fields_from_conditions(self, sub_conditions: dict) -> list:
-        """ Рекурсивно вытаскивает имена полей из словарей с уловиями обрабатывая вложеные and и or
+        """ Вытаскивает имена полей из словарей с уловиями обрабатывая вложеные and и or
+        Обход идет в глубину без рекурсии и собирает имена в один список (порядок тот же: сначала and, затем or)
         @param sub_conditions: Условия выборки
         @return: Список полей по которым идет выборка
         @rtype : list
         """
-        fields_from_conditions = list(sub_conditions.keys()) if sub_conditions else []
-        if sub_conditions.get("and"):
-            for conj_sub_conditions in sub_conditions.get("and"):
-                fields_from_conditions += self.get_fields_from_conditions(conj_sub_conditions)
-        if sub_conditions.get("or"):
-            for conj_sub_conditions in sub_conditions.get("or"):
-                fields_from_conditions += self.get_fields_from_conditions(conj_sub_conditions)
+        fields_from_conditions = []
+        stack = [sub_conditions]
+        while stack:
+            conditions = stack.pop()
+            if not conditions:
+                continue
+            fields_from_conditions.extend(conditions)
+            if "and" in conditions or "or" in conditions:
+                for conj in ("or", "and"):
+                    if conditions.get(conj):
+                        stack.extend(reversed(conditions[conj]))
         return fields_from_conditions
 
     @staticmethod
@@ -1612,11 +2057,37 @@ class SqlMapper(metaclass=ABCMeta):
         @type params: dict
         @param cache: Используемый кэш
 
+        """
+        fields, conditions, params, joins = self.prepare_select(fields, conditions, params, model_pool)
+
+        # Выполняем запрос и начинаем отдавать результаты, переводя их в формат маппера на лету:
+        converters = self.get_row_converters(fields)
+        names = [name for name, to_mapper in converters]
+        functions = [to_mapper for name, to_mapper in converters]
+        with (model_pool if model_pool else self.pool) as db:
+            for row in db.select_query(self.table_name, fields, conditions, params, joins, "get_rows", self.primary):
+                yield dict(zip(names, [
+                    value if type(value) is tuple else to_mapper(value, cache, True, model_pool)
+                    for to_mapper, value in zip(functions, row)
+                ]))
+
+    def prepare_select(self, fields: list=None, conditions: dict=None, params: dict=None, model_pool=None) -> tuple:
+        """
+        Подготавливает данные для запроса на выборку: переводит имена и значения в формат СУБД и собирает джойны
+        @param fields: Список полей для получения
+        @type fields: list
+        @param conditions: Условия выборки
+        @type conditions: dict
+        @param params: Параметры выборки
+        @type params: dict
+        @return: Поля, условия, параметры выборки в терминах СУБД и список джойнов
+        @rtype : tuple
+
         """
         # Смотрим на переданные данные и инициализируем значения, если какие-либо параметры не переданы:
         fields = fields if fields not in [[], None] else self.get_properties()
-        conditions = conditions if conditions else {}
-        params = params if params else {}
+        conditions = conditions or _empty_mapping
+        params = params or _empty_mapping
 
         # Анализируя список упоминаемых полей создаем список необходимых для выполнения запроса джойнов:
         joins = self.get_joins(
@@ -1627,13 +2098,23 @@ class SqlMapper(metaclass=ABCMeta):
         fields = self.translate_and_convert(fields, model_pool=model_pool)
         conditions = self.translate_and_convert(conditions, save_unsaved=False, model_pool=model_pool)
         params = self.translate_params(params)
+        return fields, conditions, params, joins
 
-        # Выполняем запрос и начинаем отдавать результаты, переводя их в формат маппера на лету:
-        with (model_pool if model_pool else self.pool) as db:
-            for row in db.select_query(self.table_name, fields, conditions, params, joins, "get_rows", self.primary):
-                yield self.translate_and_convert(
-                    {fields[it]: row[it] for it in range(len(fields))}, "database2mapper", cache, model_pool=model_pool
-                )
+    def get_row_converters(self, fields: list) -> list:
+        """
+        Возвращает для каждого поля выборки пару (имя свойства маппера, функция конвертации значения),
+        чтобы имена полей строк результата не переводились заново для каждой строки
+        Имена интернируются: все строки результата (и результаты разных запросов) используют одни и те же объекты ключей
+        @param fields: Список полей выборки в терминах БД
+        @type fields: list
+        @return: Список пар (имя свойства маппера, функция конвертации) в порядке полей выборки
+        @rtype : list
+
+        """
+        return [
+            (intern(self.translate(field, "database2mapper")), self.get_mapper_field(field, "database2mapper").get_to_mapper())
+            for field in fields
+        ]
 
     def get_value(self, field_name: str, conditions: dict=None, model_pool=None):
         """
@@ -1644,8 +2125,10 @@ class SqlMapper(metaclass=ABCMeta):
         @type conditions: dict
         @return: Значение искомого поля
         """
-        result = list(self.get_rows([field_name], conditions, model_pool))
-        return result[0].get(field_name) if len(result) > 0 else None
+        # Нужна только первая запись, поэтому остальные даже не запрашиваются у СУБД
+        for row in self.get_rows([field_name], conditions, {"limit": 1}, model_pool=model_pool):
+            return row.get(field_name)
+        return None
 
     def get_column(self, column_name: str, conditions: dict=None, params: dict=None, model_pool=None) -> list:
         """
@@ -1660,9 +2143,15 @@ class SqlMapper(metaclass=ABCMeta):
         @rtype : dict
 
         """
-        for row in self.generate_rows([column_name], conditions, params, model_pool=model_pool):
-            if None != row.get(column_name):
-                yield row.get(column_name)
+        # Значения берутся прямо из первой колонки результата, без построения словаря для каждой строки
+        fields, conditions, params, joins = self.prepare_select([column_name], conditions, params, model_pool)
+        (name, to_mapper), = self.get_row_converters(fields)
+        with (model_pool if model_pool else self.pool) as db:
+            for value in db.select_query(self.table_name, fields, conditions, params, joins, "get_column", self.primary):
+                if type(value) is not tuple:
+                    value = to_mapper(value, None, True, model_pool)
+                if None != value:
+                    yield value
 
     def get_row(self, fields: list=None, conditions: dict=None, model_pool=None) -> dict:
         """
@@ -1675,7 +2164,8 @@ class SqlMapper(metaclass=ABCMeta):
         @rtype : dict
 
         """
-        result = list(self.get_rows(fields, conditions, model_pool=model_pool))
+        # Запись возвращается, только если она единственная, поэтому для проверки достаточно выбрать не более двух
+        result = list(self.get_rows(fields, conditions, {"limit": 2}, model_pool=model_pool))
         return result[0] if len(result) == 1 else None
 
     def get_rows(self, fields: list=None, conditions: dict=None, params: dict=None, cache=None, model_pool=None) -> list:
@@ -1722,12 +2212,13 @@ class SqlMapper(metaclass=ABCMeta):
         """
         Выполняет вставку новой записи в таблицу
         Для вставки одной записи параметр data должен быть словарем, для вставки нескольких - списком словарей
+        (список вставляется через insert_many(), то есть многострочными запросами, когда это возможно)
         @param data: Данные для вставки
         @type data: list or dict
         @return: Значение первичного ключа для добавленной записи
         """
         if type(data) is list:
-            return [self.insert(it, model_pool) for it in data]
+            return self.insert_many(data, model_pool)
 
         if not isinstance(data, dict):
             raise TableMapperException("Insert failed: unknown item format")
@@ -1736,7 +2227,7 @@ class SqlMapper(metaclass=ABCMeta):
 
         try:
             last_record = (model_pool if model_pool else self.pool).db.insert_query(
-                self.table_name, self.translate_and_convert(data, model_pool=model_pool), self.primary
+                self.table_name, self.translate_rows([data], model_pool)[0], self.primary
             )
         except DublicateRecordException as err:
             raise self.__class__.dublicate_record_exception(err)
@@ -1744,26 +2235,80 @@ class SqlMapper(metaclass=ABCMeta):
             last_record if self.primary.defined_by_user is False and last_record and last_record != 0 else data
         )
 
-    def update(self, data: dict, conditions: dict=None, params: dict=None, model_pool=None):
+    def insert_many(self, data: list, model_pool=None) -> list:
+        """
+        Выполняет вставку нескольких записей в таблицу
+        Если значения первичного ключа не генерируются СУБД, идущие подряд записи с одинаковым набором полей
+        вставляются многострочными запросами по bulk_insert_size записей, иначе - по одной
+        Записи вставляются в порядке следования в списке
+        @param data: Список словарей с данными для вставки
+        @type data: list
+        @return: Список значений первичного ключа для добавленных записей
+        @rtype : list
+        """
+        if self.primary.exists() and (self.primary.autoincremented or self._has_rows_without_primary(data)):
+            return [self.insert(it, model_pool) for it in data]
+
+        for it in data:
+            if not isinstance(it, dict):
+                raise TableMapperException("Insert failed: unknown item format")
+            elif it == {}:
+                raise TableModelException("Can't insert an empty record")
+        db = (model_pool if model_pool else self.pool).db
+        try:
+            for _, rows in groupby(self.translate_rows(data, model_pool), key=lambda row: tuple(row.keys())):
+                db.insert_many_query(self.table_name, list(rows), self.primary, self.bulk_insert_size)
+        except DublicateRecordException as err:
+            raise self.__class__.dublicate_record_exception(err)
+        return [self.primary.grab_value_from(it) for it in data]
+
+    def _has_rows_without_primary(self, data: list) -> bool:
+        """
+        Есть ли среди записей такие, значение первичного ключа которых не задано (его заполнит СУБД)
+        @param data: Список словарей с данными для вставки
+        @type data: list
+        @rtype : bool
+        """
+        if self.primary.compound:
+            return False
+        primary_name = self.primary.name()
+        for it in data:
+            value = it.get(primary_name) if isinstance(it, dict) else None
+            if value is None or isinstance(value, FieldValues.NoneValue):
+                return True
+        return False
+
+    def update(self, data: dict, conditions: dict=None, params: dict=None, model_pool=None, return_ids: bool=True):
         """
         Выполняет обновление существующих в таблице записей
+        Ключи обновляемых записей выбираются заранее только если они запрошены, иначе выполняется
+        один запрос на обновление по условиям
         @param data: Новые данные
         @type data: dict
         @param conditions: Условия выборки записей для применения обновлений
         @type conditions: dict
-        @return: Значение первичного ключа для обновленной записи/записей
+        @param return_ids: Нужно ли выбрать и вернуть первичные ключи обновленных записей
+        @type return_ids: bool
+        @return: Значение первичного ключа для обновленной записи/записей, если они запрошены, иначе None
         """
         conditions = conditions or {}
-        if self.primary.exists():           # Если, конечно, первичный ключ определен
+        # Выборка переводит параметры в формат БД на месте, поэтому ей передается копия:
+        # сам запрос на обновление переводит исходные параметры
+        select_params = dict(params) if params else params
+        if return_ids is False:
+            changed_records_ids = None
+        elif self.primary.exists():         # Если, конечно, первичный ключ определен
             if self.primary.compound:       # Если он составной
                 # noinspection PyTypeChecker
                 changed_records_ids = [
                     self.primary.grab_value_from(chid)
-                    for chid in self.get_rows(self.primary.name(), conditions, params, model_pool=model_pool)
+                    for chid in self.get_rows(self.primary.name(), conditions, select_params, model_pool=model_pool)
                 ]
             else:                           # Если он обычный
+                # Ключи выбираются даже если условия заданы значением первичного ключа: выборка проверяет,
+                # что запись существует, иначе обновленных записей нет
                 changed_records_ids = list(
-                    self.get_column(self.primary.name(), conditions, params, model_pool=model_pool)
+                    self.get_column(self.primary.name(), conditions, select_params, model_pool=model_pool)
                 )
         else:
             changed_records_ids = []
@@ -1783,13 +2328,17 @@ class SqlMapper(metaclass=ABCMeta):
 
     def delete(self, conditions: dict=None, model_pool=None):
         """
-        Подсчитывает количество строк в таблице, в соответствии с условиями (если они переданы)
+        Удаляет строки таблицы в соответствии с условиями (если они переданы)
+        Ключи удаляемых записей выбираются заранее только если от записей зависят записи списков,
+        которые нужно отвязать, иначе выполняется один запрос на удаление по условиям
         @param conditions: Параметры выборки для удаления строки из таблицы
         @type conditions: dict
-        @return:
+        @return: Список первичных ключей удаленных записей, если их пришлось выбрать, иначе None
 
         """
-        if self.primary.exists() and self.primary.compound is False:           # Если, конечно, первичный ключ определен
+        if self.primary.exists() and self.primary.compound is False and self._dependent_list_fields:
+            # Ключи выбираются даже если условия заданы значением первичного ключа: выборка проверяет,
+            # что запись существует, иначе удалять и отвязывать нечего
             changed_records_ids = [
                 i.get_value() if isinstance(i, ValueInside) else i
                 for i in self.get_column(self.primary.name(), conditions, model_pool=model_pool)
@@ -1816,9 +2365,13 @@ class SqlMapper(metaclass=ABCMeta):
         @rtype : (dict, dict)
 
         """
-        mapper_field_is_list = lambda field: self.is_list(self.get_property(field))
-        lists, flats = partition(mapper_field_is_list, data)
-        return {field: data[field] for field in flats}, {self.get_property(field): data[field] for field in lists}
+        list_fields = self._list_fields
+        if list_fields.isdisjoint(data):
+            return dict(data), {}
+        return (
+            {field: value for field, value in data.items() if field not in list_fields},
+            {self.get_property(field): value for field, value in data.items() if field in list_fields}
+        )
 
     @staticmethod
     def link_all_list_objects(data: dict, main_record_obj: RecordModel, model_pool=None):
@@ -1834,11 +2387,9 @@ class SqlMapper(metaclass=ABCMeta):
             mapper_field.save_items(data[mapper_field], main_record_obj, model_pool)
 
     def unlink_objects(self, changed_records_ids, model_pool=None):
-        for mapper_field_name in self.get_properties():
-            mapper_field = self.get_property(mapper_field_name)
-            if self.is_list_with_dependencies(mapper_field):
-                # noinspection PyUnresolvedReferences
-                mapper_field.clear_dependencies_from(changed_records_ids, model_pool)
+        for mapper_field_name in self._dependent_list_fields:
+            # noinspection PyUnresolvedReferences
+            self.get_property(mapper_field_name).clear_dependencies_from(changed_records_ids, model_pool)
 
     ##################################################################################################################
     def translate_and_convert(self, value, direction: str="mapper2database", cache=None, save_unsaved=True, model_pool=None):
@@ -1850,33 +2401,161 @@ class SqlMapper(metaclass=ABCMeta):
         @param cache: Используемый в запросе объект-кэш
         @return: Конвертированный объект
         """
-        if isinstance(value, list):
-            return [self.translate_and_convert(newvalue, direction, cache, save_unsaved, model_pool) for newvalue in value]
-        elif isinstance(value, dict):
-            converted = {}
-            for field in value:
-                if field in ["or", "and"]:
-                    converted[field] = self.translate_and_convert(value[field], direction, cache, save_unsaved, model_pool)
+        # Обработчик выбирается по точному типу значения одним обращением к словарю,
+        # подклассы списков и словарей (например, ListValue) определяются через isinstance
+        handler = self._converters_by_type.get(type(value))
+        if handler is None:
+            if isinstance(value, list):
+                handler = self._translate_and_convert_list
+            elif isinstance(value, dict):
+                handler = self._translate_and_convert_dict
+            else:
+                return value
+        return handler(value, direction, cache, save_unsaved, model_pool)
+
+    def _translate_and_convert_list(self, value: list, direction: str, cache, save_unsaved, model_pool):
+        """ Конвертирует каждый элемент списка (см. translate_and_convert) """
+        return [self.translate_and_convert(newvalue, direction, cache, save_unsaved, model_pool) for newvalue in value]
+
+    def _translate_and_convert_dict(self, value: dict, direction: str, cache, save_unsaved, model_pool):
+        """ Конвертирует словарь с данными записи или условиями выборки (см. translate_and_convert) """
+        # Ключи словаря - всегда имена полей (или and/or), поэтому переводы ключей и конвертеры значений
+        # берутся из плана, построенного один раз для этого набора ключей
+        if self._caches_version != _maps_version:
+            self._reset_derived_caches()
+        keys = tuple(value)
+        plan = self._dict_plans.get((keys, direction)) or self.get_dict_plan(keys, direction)
+        converted = {}
+        for (field, translted_field, convert), field_value in zip(plan, value.values()):
+            if type(field_value) is tuple:
+                if field_value[0] in ("in", "nin"):
+                    # Обычно список уже состоит из простых значений (например, ключей из get_column),
+                    # тогда он передается дальше как есть, без построения копии. Проверяются только
+                    # различные типы элементов (их набор собирается без цикла на уровне Python)
+                    values = field_value[1]
+                    if type(values) is not list or any(
+                        issubclass(value_type, ValueInside) for value_type in set(map(type, values))
+                    ):
+                        values = [it.get_value() if isinstance(it, ValueInside) else it for it in values]
+                    converted[translted_field] = (field_value[0], values)
+                elif isinstance(field_value[1], ValueInside):
+                    converted[translted_field] = (field_value[0], field_value[1].get_value())
                 else:
-                    translted_field = self.translate_and_convert(field, direction, cache, save_unsaved, model_pool)
-                    if type(value[field]) is tuple:
-                        if value[field][0] in ["in", "nin"]:
-                            converted[translted_field] = (
-                                value[field][0],
-                                [it.get_value() if isinstance(it, ValueInside) else it for it in value[field][1]]
-                            )
-                        elif isinstance(value[field][1], ValueInside):
-                            converted[translted_field] = (value[field][0], value[field][1].get_value())
-                        else:
-                            converted[translted_field] = value[field]
-                    else:
-                        mapper_field = self.get_mapper_field(field, direction)
-                        converted[translted_field] = mapper_field.convert(value[field], direction, cache, save_unsaved, model_pool)
-            return converted
-        elif type(value) is str:
-            return self.translate(value, direction)
-        else:
-            return value
+                    converted[translted_field] = field_value
+            elif convert is not None:
+                converted[translted_field] = convert(field_value, cache, save_unsaved, model_pool)
+            elif field in ("or", "and"):
+                converted[field] = self.translate_and_convert(field_value, direction, cache, save_unsaved, model_pool)
+            else:
+                convert = self.get_value_converter(field, direction)
+                converted[translted_field] = convert(field_value, cache, save_unsaved, model_pool)
+        return converted
+
+    def _translate_and_convert_str(self, value: str, direction: str, cache, save_unsaved, model_pool):
+        """ Переводит обращение к полю (см. translate_and_convert) """
+        return self.translate(value, direction)
+
+    def get_dict_plan(self, keys: tuple, direction: str) -> tuple:
+        """
+        Возвращает план конвертации словаря с заданным набором ключей (данных записи или условий выборки):
+        для каждого ключа - переведенный ключ и функцию конвертации значения.
+        Схема маппера не меняется от записи к записи, поэтому переводы и выбор конвертеров выполняются
+        один раз для набора ключей, а не для каждого словаря
+        Для and/or и ключей, поле маппера для которых не найдено, конвертер не выбирается (None)
+        @param keys: Ключи словаря в порядке их следования
+        @type keys: tuple
+        @param direction: Направление конвертации
+        @type direction: str
+        @return: Кортеж троек (ключ, переведенный ключ, функция конвертации) в порядке ключей
+        @rtype : tuple
+
+        """
+        plan = []
+        for field in keys:
+            if field in ("or", "and"):
+                plan.append((field, field, None))
+                continue
+            try:
+                mapper_field = self.get_mapper_field(field, direction) if type(field) is str else None
+            except AttributeError:
+                # Обращение к связанному маперу, которого нет в карте: значение такого ключа может быть только
+                # условием, а для остальных значений ошибка возникнет при конвертации, как и без плана
+                mapper_field = None
+            plan.append((
+                field, self._translate_key(field, direction),
+                self.get_value_converter(field, direction) if mapper_field is not None else None
+            ))
+        plan = tuple(plan)
+        if self.binded:
+            if len(self._dict_plans) >= self.dict_plans_cache_size:
+                self._dict_plans.clear()
+            self._dict_plans[(keys, direction)] = plan
+        return plan
+
+    def translate_rows(self, rows: list, model_pool=None) -> list:
+        """
+        Переводит в формат БД список словарей с данными записей (для вставки)
+        @param rows: Список словарей с данными записей в терминах маппера
+        @type rows: list
+        @return: Список словарей с данными записей в терминах БД
+        @rtype : list
+
+        """
+        return self.translate_and_convert_many(rows, model_pool=model_pool)
+
+    def translate_and_convert_many(self, records: list, direction: str="mapper2database", cache=None, save_unsaved=True,
+                                   model_pool=None) -> list:
+        """
+        Конвертирует список словарей с данными записей (аналогично translate_and_convert для каждого из них)
+        Идущие подряд записи с одинаковым набором полей конвертируются по колонкам: план конвертации берется
+        один раз, и конвертер каждого поля применяется ко всей колонке значений сразу
+        @param records: Список словарей с данными записей
+        @type records: list
+        @param direction: Направление конвертации
+        @type direction: str
+        @param cache: Используемый в запросе объект-кэш
+        @return: Список сконвертированных словарей в исходном порядке
+        @rtype : list
+
+        """
+        if self._caches_version != _maps_version:
+            self._reset_derived_caches()
+        converted = []
+        start, length = 0, len(records)
+        while start < length:
+            fields = records[start].keys()
+            end = start + 1
+            while end < length and records[end].keys() == fields:
+                end += 1
+            group = records[start:end]
+            start = end
+            keys = tuple(fields)
+            plan = self._dict_plans.get((keys, direction)) or self.get_dict_plan(keys, direction)
+            if not plan:
+                converted.extend({} for _ in group)
+            elif any(convert is None for field, name, convert in plan):
+                # and/or или поля, которых нет в карте маппера, - такие записи конвертируются по одной
+                converted.extend(
+                    self.translate_and_convert(record, direction, cache, save_unsaved, model_pool) for record in group
+                )
+            else:
+                names = [name for field, name, convert in plan]
+                columns = [
+                    [convert(record[field], cache, save_unsaved, model_pool) for record in group]
+                    for field, name, convert in plan
+                ]
+                converted.extend(dict(zip(names, values)) for values in zip(*columns))
+        return converted
+
+    def _translate_key(self, name, direction: str):
+        """
+        Переводит ключ словаря данных или условий выборки (аналогично translate_and_convert для отдельного значения)
+        @param name: Ключ словаря
+        @param direction: Направление конвертации
+        @type direction: str
+        @return: Переведенный ключ
+        """
+        return self.translate(name, direction) if type(name) is str else name
 
     def translate(self, name: str, direction: str) -> str:
         """
@@ -1889,13 +2568,25 @@ class SqlMapper(metaclass=ABCMeta):
         @rtype : str
 
         """
+        # Переводы запоминаются до следующего изменения карты какого-либо маппера (см. _analyze_map)
+        key = (name, direction)
+        if self._caches_version == _maps_version:
+            translated = self._translations.get(key)
+            if translated is not None:
+                return translated
+        else:
+            self._reset_derived_caches()
+
         field = self.get_mapper_field(name, direction, first=True)
 
         if not field:
             raise TableMapperException(
                 "Поле %s не определено в коллекции %s" % (name, self.get_new_collection().__class__)
             )
-        return field.translate(name, direction)
+        translated = field.translate(name, direction)
+        if self.binded and translated is not None:
+            self._translations[key] = translated
+        return translated
 
     def get_mapper_field(self, field_name: str, direction: str, first: bool=False) -> FieldTypes.BaseField:
         """
@@ -1910,12 +2601,44 @@ class SqlMapper(metaclass=ABCMeta):
         @rtype : FieldTypes.BaseField
 
         """
+        # Найденные поля запоминаются до следующего изменения карты какого-либо маппера (см. _analyze_map)
+        key = (field_name, direction, first)
+        if self._caches_version == _maps_version:
+            mapper_field = self._mapper_fields.get(key)
+            if mapper_field is not None:
+                return mapper_field
+        else:
+            self._reset_derived_caches()
+
+        mapper_field = self._find_mapper_field(field_name, direction, first)
+        if self.binded and mapper_field is not None:
+            self._mapper_fields[key] = mapper_field
+        return mapper_field
+
+    def get_value_converter(self, field_name: str, direction: str):
+        """
+        Возвращает уже выбранную функцию конвертации значений поля в заданном направлении
+        Для одного поля маппера она не меняется от записи к записи, поэтому планы конвертации словарей
+        запоминают ее вместо поиска поля и выбора конвертера по типам для каждого значения
+        @param field_name: Обращение к полю (либо в терминах маппера, либо в терминах бд)
+        @type field_name: str
+        @param direction: Направление конвертации
+        @type direction: str
+        @return: Функция вида f(value, cache, save_unsaved, model_pool=None)
+
+        """
+        mapper_field = self.get_mapper_field(field_name, direction)
+        if direction == "mapper2database":
+            return mapper_field.get_to_database()
+        return mapper_field.get_to_mapper()
+
+    def _find_mapper_field(self, field_name: str, direction: str, first: bool) -> FieldTypes.BaseField:
+        """ Находит поле маппера по текстовому обращению (см. get_mapper_field) """
         if field_name.endswith("]"):
-            mapper_field_name = re.search("\[(.+?)\]", field_name).group(1)
+            mapper_field_name = _bracketed_name.search(field_name).group(1)
             return self.get_property(mapper_field_name)
-        if field_name.find(".") > -1:
-            path = field_name.split(".")
-            mapper_field_name, mapper_field_property = path[0], ".".join(path[1:])
+        if "." in field_name:
+            mapper_field_name, dot, mapper_field_property = field_name.partition(".")
             if direction == "database2mapper":
                 foreign_table, foreign_table_field_name = mapper_field_name, mapper_field_property
                 mapper_field_name = self.get_property(foreign_table).get_name()
@@ -1956,6 +2679,8 @@ class SqlMapper(metaclass=ABCMeta):
 class NoSqlMapper(SqlMapper, metaclass=ABCMeta):
     """ Класс для создания мапперов к NoSql коллекциям """
     support_joins = False
+    # Максимальное количество ключей основных записей в условии $in одного запроса реверсных моделей
+    reversed_fetch_size = 5000
 
     def object_id(self, mapper_field_name, db_field_name):
         return FieldTypes.NoSqlObjectID(self, mapper_field_name, db_field_name=db_field_name)
@@ -2052,6 +2777,24 @@ class NoSqlMapper(SqlMapper, metaclass=ABCMeta):
         """ Переопределяем базовый метод, join'ы не поддерживаются """
         return []
 
+    def get_column(self, column_name: str, conditions: dict=None, params: dict=None, model_pool=None) -> list:
+        """
+        Возвращает список значений одной из колонок таблицы в соответствии с условиями и параметрами выборки
+        Документы коллекции разбираются в generate_rows(), поэтому значения берутся из уже собранных строк
+        @param column_name: Имя колонки таблицы
+        @type column_name: str
+        @param conditions: Условия выборки записи
+        @type conditions: dict
+        @param params: Параметры выборки
+        @type params: dict
+        @return: Список значений для указанной колонки, взятых из строк, удовлетворяющих условиям выборки
+        @rtype : dict
+
+        """
+        for row in self.generate_rows([column_name], conditions, params, model_pool=model_pool):
+            if None != row.get(column_name):
+                yield row.get(column_name)
+
     def split_data_by_relation_type(self, data: dict) -> (dict, dict):
         """ Переопределяем базовый метод так, чтобы он не отделял значения типа list от общей массы данных """
         lists, flat = {}, {}
@@ -2077,18 +2820,23 @@ class NoSqlMapper(SqlMapper, metaclass=ABCMeta):
         """
         # Анализируем список запрошенных полей
         main_collection_fields = [field.split(".")[0] for field in fields]
-        reversed_collections = [key for key in self.get_properties() if self.is_reversed_list(self.get_property(key))]
+        reversed_collections = list(self._dependent_list_fields)
         embedded_collections = [key for key in main_collection_fields if self.is_real_embedded(self.get_property(key))]
+        has_links = any(
+            self.get_roles(key) & (ROLE_REL | ROLE_REAL_EMBEDDED) == ROLE_REL for key in main_collection_fields
+        )
         main_collection_fields = self.translate_and_convert(main_collection_fields, model_pool=model_pool)
         if len(main_collection_fields) > 0:
             main_collection_fields.append("_id")
             reversed_collections = list(set(reversed_collections) & set(main_collection_fields))
 
         # Разбиваем условия выборки на группы в соответствии с коллекцией:
-        collection_conditions = {"self": self.translate_and_convert(conditions, save_unsaved=False, model_pool=model_pool)}
+        collection_conditions = {
+            "self": self.translate_and_convert(conditions, cache=cache, save_unsaved=False, model_pool=model_pool)
+        }
         if conditions:
             for key in conditions:
-                if key.find(".") > -1 and self.is_rel(self.get_property(key.split(".")[0])):
+                if "." in key and self.is_rel(self.get_property(key.split(".")[0])):
                     collection_conditions[key.split(".")[0]] = {key.split(".")[1]: conditions[key]}
         # Конвертируем параметры выборки
         params = self.translate_params(params)
@@ -2101,22 +2849,36 @@ class NoSqlMapper(SqlMapper, metaclass=ABCMeta):
         generator = (model_pool if model_pool else self.pool).db.select_query(
             self.table_name, main_collection_fields, collection_conditions["self"], params
         )
+
+        # Если не нужны ни реверсные модели, ни свойства внешних моделей или вложенных документов,
+        # основные записи отдаются по мере чтения из курсора, без накопления всей выборки в памяти
+        if not reversed_collections and (not fields or not (has_links or embedded_collections)):
+            drop_id = not self.get_property_by_db_name("_id") or (len(fields) > 0 and self.primary.name() not in fields)
+            for row in generator:
+                if drop_id:
+                    del row["_id"]
+                yield self.translate_and_convert(row, "database2mapper", cache, model_pool=model_pool)
+            return
+
+        # Набор ключей у документов коллекции один и тот же, поэтому имя свойства маппера для ключа и признак того,
+        # является ли свойство ссылкой на внешние модели, определяются один раз на ключ, а не для каждой строки
+        links_by_key = {}
         for row in generator:
             rows.append(row)
             rows_primaries.append(row.get("_id"))
             for key in row:
-                key_in_mapper = self.translate_and_convert(key, "database2mapper", model_pool=model_pool)
-                mf = self.get_property(key_in_mapper)
-                if mf and self.is_rel(mf) and not self.is_real_embedded(mf):
-                    if type(row[key]) is list:
-                        for obid in row[key]:
-                            if key in foreign_models_by_row:
-                                foreign_models_by_row[key][row["_id"]].append(obid)
-                            foreign_models_primaries[key_in_mapper].append(obid)
-                    else:
+                if key not in links_by_key:
+                    key_in_mapper = self._translate_key(key, "database2mapper")
+                    mf = self.get_property(key_in_mapper)
+                    links_by_key[key] = key_in_mapper if mf and self.is_rel(mf) and not self.is_real_embedded(mf) else None
+                key_in_mapper = links_by_key[key]
+                if key_in_mapper is not None:
+                    # Ключи внешних моделей добавляются в списки целиком, а не по одному
+                    obids = row[key] if type(row[key]) is list else [row[key]]
+                    if obids:
                         if key in foreign_models_by_row:
-                            foreign_models_by_row[key][row["_id"]].append(row[key])
-                        foreign_models_primaries[key_in_mapper].append(row[key])
+                            foreign_models_by_row[key][row["_id"]].extend(obids)
+                        foreign_models_primaries[key_in_mapper].extend(obids)
         foreign_models_primaries = dict(foreign_models_primaries)
         foreign_models_by_row = dict(foreign_models_by_row)
 
@@ -2126,24 +2888,27 @@ class NoSqlMapper(SqlMapper, metaclass=ABCMeta):
         for prop in reversed_collections:
             # noinspection PyUnresolvedReferences
             linked_mapper = self.get_property(prop).get_items_collection_mapper()
-            main_record_key = linked_mapper.get_property_that_is_link_for(self)
-            rev_collection_condtions = {main_record_key.get_db_name(): {"$in": rows_primaries}}
+            # Имя поля, которым реверсные модели ссылаются на основные записи, одинаково для всех строк выборки
+            main_record_key = linked_mapper.get_property_that_is_link_for(self).get_db_name()
+            extra_conditions = None
             if collection_conditions.get(prop):
-                rev_collection_condtions.update(
-                    linked_mapper.translate_and_convert(collection_conditions.get(prop), save_unsaved=False, model_pool=model_pool),
-                    model_pool=model_pool
+                extra_conditions = linked_mapper.translate_and_convert(
+                    collection_conditions.get(prop), cache=cache, save_unsaved=False, model_pool=model_pool
                 )
-            requested_fields = ["_id", main_record_key.get_db_name()]
-            generator = (model_pool if model_pool else linked_mapper.pool).db.select_query(
-                linked_mapper.table_name, requested_fields, rev_collection_condtions
-            )
-            for reversed_model in generator:
-                reversed_models_by_row[prop][reversed_model[main_record_key.get_db_name()]].append(
-                    reversed_model.get("_id")
+            requested_fields = ["_id", main_record_key]
+            models_by_row = reversed_models_by_row[prop]
+            # Ключи основных записей передаются в условие $in пачками, чтобы не строить огромных запросов
+            for primaries in chunks(rows_primaries, self.reversed_fetch_size):
+                rev_collection_condtions = {main_record_key: {"$in": primaries}}
+                if extra_conditions:
+                    rev_collection_condtions.update(extra_conditions)
+                generator = (model_pool if model_pool else linked_mapper.pool).db.select_query(
+                    linked_mapper.table_name, requested_fields, rev_collection_condtions
                 )
+                for reversed_model in generator:
+                    models_by_row[reversed_model[main_record_key]].append(reversed_model.get("_id"))
             for list_objid in reversed_models_by_row[prop].values():
-                for objid in list_objid:
-                    reversed_models_primaries[prop].append(objid)
+                reversed_models_primaries[prop].extend(list_objid)
         reversed_models_primaries = dict(reversed_models_primaries)
         reversed_models_by_row = dict(reversed_models_by_row)
 
@@ -2154,36 +2919,68 @@ class NoSqlMapper(SqlMapper, metaclass=ABCMeta):
         if fields and len(fields) > 0:
             # Если свойства запрошены у внешних моделей, связанных с основными записями:
             if foreign_models_primaries != {}:
+                # Модели одной коллекции, на которые ссылаются разные поля, загружаются одним запросом:
+                # первичные ключи и запрашиваемые поля таких полей объединяются (кроме полей с собственными условиями)
+                plans = {}
+                shared_fetches = {}
                 for key in foreign_models_primaries:
                     mf = self.get_property(key)
                     # noinspection PyUnresolvedReferences
                     linked_mapper = mf.get_items_collection_mapper()
                     key_in_db = mf.get_db_name()
-                    mapper_type_models = foreign_models_by_row.get(key_in_db)
-
-                    # Создаем словарь с условиями выборки моделей
-                    basic_conditions = {"_id": {"$in": foreign_models_primaries[key]}}
-                    if collection_conditions["self"] and collection_conditions["self"].get(key_in_db):
-                        basic_conditions.update({"_id": collection_conditions["self"].get(key_in_db)})
 
                     # Создаем список для заполнения полей выбираемых моделей
                     requested_fields = [field.split(".")[1] for field in fields if field.split(".")[0] == key]
                     db_fields = linked_mapper.translate_and_convert(requested_fields, model_pool=model_pool)
                     db_fields.append("_id")
 
-                    # Заполняем модели
-                    foreign_models = {}
-                    generator = (model_pool if model_pool else linked_mapper.pool).db.select_query(
-                        linked_mapper.table_name, db_fields, basic_conditions
+                    # Создаем словарь с условиями выборки моделей
+                    if collection_conditions["self"] and collection_conditions["self"].get(key_in_db):
+                        fetch = {"ids": None, "fields": db_fields, "mapper": linked_mapper, "models": None}
+                        fetch["conditions"] = {"_id": collection_conditions["self"].get(key_in_db)}
+                    else:
+                        fetch = shared_fetches.get(linked_mapper)
+                        if fetch is None:
+                            fetch = shared_fetches[linked_mapper] = {
+                                "ids": [], "fields": [], "mapper": linked_mapper, "models": None, "conditions": None
+                            }
+                        fetch["ids"].extend(foreign_models_primaries[key])
+                        fetch["fields"].extend(f for f in db_fields if f not in fetch["fields"])
+                    plans[key] = (linked_mapper, foreign_models_by_row.get(key_in_db), fetch)
+
+                # Основные записи переводятся в формат маппера один раз, а не для каждого поля-связи.
+                # Незапрошенные поля отбрасываются до конвертации (решение принимается один раз для каждого ключа)
+                requested = set(fields)
+                requested_keys = {}
+                main_records_for_yield = []
+                for main_record in rows:
+                    main_record_for_yield = {}
+                    for key, value in main_record.items():
+                        keep = requested_keys.get(key)
+                        if keep is None:
+                            keep = requested_keys[key] = self._translate_key(key, "database2mapper") in requested
+                        if keep:
+                            main_record_for_yield[key] = value
+                    main_records_for_yield.append(
+                        self.translate_and_convert(main_record_for_yield, "database2mapper", cache, model_pool=model_pool)
                     )
-                    for row in generator:
-                        foreign_models[row["_id"]] = row
-
-                    for main_record in rows:
-                        main_record_for_yield = self.translate_and_convert(main_record, "database2mapper", cache, model_pool=model_pool)
-                        main_record_for_yield = {
-                            key: main_record_for_yield[key] for key in main_record_for_yield if key in fields
-                        }
+
+                for key in foreign_models_primaries:
+                    linked_mapper, mapper_type_models, fetch = plans[key]
+
+                    # Заполняем модели
+                    foreign_models = fetch["models"]
+                    if foreign_models is None:
+                        foreign_models = fetch["models"] = {}
+                        generator = (model_pool if model_pool else linked_mapper.pool).db.select_query(
+                            linked_mapper.table_name, fetch["fields"],
+                            fetch["conditions"] or {"_id": {"$in": list(dict.fromkeys(fetch["ids"]))}}
+                        )
+                        for row in generator:
+                            foreign_models[row["_id"]] = row
+
+                    for main_record, main_record_for_yield in zip(rows, main_records_for_yield):
+                        main_record_for_yield = dict(main_record_for_yield)
                         row_models = mapper_type_models.get(main_record["_id"])
                         if row_models:
                             models_in_this_row = [foreign_models.get(rm) for rm in row_models]
@@ -2191,7 +2988,7 @@ class NoSqlMapper(SqlMapper, metaclass=ABCMeta):
                                 if item:
                                     item = {
                                         field: item[linked_mapper.translate(field.split(".")[1], "mapper2database")]
-                                        for field in fields if field.find(".") > -1
+                                        for field in fields if "." in field
                                     }
                                     item.update(main_record_for_yield)
                                     yield item
@@ -2203,6 +3000,7 @@ class NoSqlMapper(SqlMapper, metaclass=ABCMeta):
                 return
             # Если свойства запрошены у вложенных документов основных записей
             elif len(embedded_collections) > 0:
+                document_conditions = self.compile_document_conditions(collection_conditions)
                 for row in rows:
                     row = self.translate_and_convert(row, "database2mapper", cache, model_pool=model_pool)
                     for subcollection in row:
@@ -2210,10 +3008,10 @@ class NoSqlMapper(SqlMapper, metaclass=ABCMeta):
                             if not isinstance(row[subcollection], list):
                                 row[subcollection] = [row[subcollection]]
                             for item in row[subcollection]:
-                                if self.document_match(item, subcollection, collection_conditions):
+                                if self.document_match(item, document_conditions.get(subcollection)):
                                     item = item.__dict__
                                     item = {
-                                        field: item[field.split(".")[1]] for field in fields if field.find(".") > -1
+                                        field: item[field.split(".")[1]] for field in fields if "." in field
                                     }
                                     main_record = {field: row[field] for field in fields if row.get(field)}
                                     item.update(main_record)
@@ -2229,40 +3027,39 @@ class NoSqlMapper(SqlMapper, metaclass=ABCMeta):
             yield self.translate_and_convert(row, "database2mapper", cache, model_pool=model_pool)
 
     @staticmethod
-    def document_match(model, property_name, conditions):
+    def compile_document_conditions(conditions):
+        """
+        Приводит условия выборки по embedded коллекциям к списку проверок, готовому для document_match
+        Исходный словарь условий не изменяется, неизвестные операторы отбрасываются
+        @param conditions: Условия выборки в формате {имя embedded коллекции: {ключ: значение или (оператор, значение)}}
+        @return: Словарь в формате {имя embedded коллекции: [(ключ, проверка оператора, значение), ...]}
+        """
+        compiled = {}
+        for property_name, property_conditions in conditions.items():
+            if not property_conditions:
+                continue
+            checks = []
+            for key, condition in property_conditions.items():
+                operator, value = condition if type(condition) is tuple else ("e", condition)
+                check = _document_operators.get(operator)
+                if check is not None:
+                    checks.append((key, check, value))
+            compiled[property_name] = checks
+        return compiled
+
+    @staticmethod
+    def document_match(model, conditions):
         """
         Сравнивает переданную модель с переданными условиями
         @param model: Модель для проверки соответствия условиям
-        @param property_name: Имя embedded коллекции, частью которой является проверямая модель
-        @param conditions: Условия выборки
-        @return:
+        @param conditions: Проверки embedded коллекции, подготовленные compile_document_conditions
+        @return: Признак соответствия модели условиям
         """
-        conditions = conditions.get(property_name)
         if conditions:
-            for key in conditions:
-                if type(conditions[key]) is not tuple:
-                    conditions[key] = ("e", conditions[key])
-                operator, value = conditions[key]
-                option = model.get_data().get(key)
-                if not option:
-                    continue
-                elif operator == "in" and option not in value:
-                    return False
-                elif operator == "nin" and option in value:
-                    return False
-                elif operator == "e" and option != value:
-                    return False
-                elif operator == "ne" and option == value:
-                    return False
-                elif operator == "gt" and option <= value:
-                    return False
-                elif operator == "gte" and option < value:
-                    return False
-                elif operator == "lt" and option >= value:
-                    return False
-                elif operator == "lte" and option > value:
-                    return False
-                elif operator == "match" and option.find(value) == -1:
+            data = model.get_data()
+            for key, check, value in conditions:
+                option = data.get(key)
+                if option and not check(option, value):
                     return False
         return True
 
@@ -2275,8 +3072,10 @@ class NoSqlMapper(SqlMapper, metaclass=ABCMeta):
         @return: Сконвертированный результат
         """
         new_conditions = {}
+        # Условия на связанные коллекции, сгруппированные по полю связи: {имя поля: (поле, {ключ: условие})}
+        relations_conditions = {}
         for key in conditions:
-            if key.find(".") > -1:
+            if "." in key:
                 path = key.split(".")
                 if len(path) > 2:
                     mapper_field_name, other_mapper_property_name = path[0], ".".join(path[1:len(path)-1])
@@ -2288,80 +3087,102 @@ class NoSqlMapper(SqlMapper, metaclass=ABCMeta):
                 elif self.is_rel(mf):
                     # noinspection PyUnresolvedReferences
                     fmapper = mf.get_items_collection_mapper()
-                    if self.is_list_with_dependencies(mf):
-                        sub_conditions = fmapper.pool.db.select_query(
-                            fmapper.table_name, [fmapper.get_property_that_is_link_for(self).get_db_name()],
-                            self.to_mongo_conditions_format(
-                                {fmapper.translate(other_mapper_property_name, "mapper2database"): conditions[key]}
-                            )
-                        )
-                        new_conditions["_id"] = (
-                            "in",
-                            [el[fmapper.get_property_that_is_link_for(self).get_db_name()] for el in sub_conditions]
-                        )
-                    else:
-                        sub_conditions = fmapper.pool.db.select_query(
-                            fmapper.table_name, [fmapper.primary.db_name()],
-                            self.to_mongo_conditions_format(
-                                {fmapper.translate(other_mapper_property_name, "mapper2database"): conditions[key]}
-                            )
-                        )
-                        new_conditions[mf.get_db_name()] = (
-                            "in",
-                            [el[fmapper.primary.db_name()] for el in sub_conditions]
-                        )
+                    mf_conditions = relations_conditions.setdefault(mapper_field_name, (mf, {}))[1]
+                    mf_conditions[fmapper.translate(other_mapper_property_name, "mapper2database")] = conditions[key]
             else:
                 new_conditions[key] = conditions[key]
+        # Для каждого поля связи выполняется один запрос к связанной коллекции со всеми условиями на нее сразу
+        resolved_keys = set()
+        for mf, mf_conditions in relations_conditions.values():
+            # noinspection PyUnresolvedReferences
+            fmapper = mf.get_items_collection_mapper()
+            if self.is_list_with_dependencies(mf):
+                link_name, condition_key = fmapper.get_property_that_is_link_for(self).get_db_name(), "_id"
+            else:
+                link_name, condition_key = fmapper.primary.db_name(), mf.get_db_name()
+            sub_conditions = fmapper.pool.db.select_query(
+                fmapper.table_name, [link_name], self.to_mongo_conditions_format(mf_conditions)
+            )
+            if condition_key == "_id":
+                # Много записей списка могут ссылаться на одну основную запись, поэтому ключи собираются
+                # без повторов прямо из курсора, не накапливая сами документы
+                ids = list(dict.fromkeys(el[link_name] for el in sub_conditions))
+            else:
+                ids = [el[link_name] for el in sub_conditions]
+            if condition_key in resolved_keys:
+                # Несколько списков связей ограничивают одни и те же основные записи - нужны записи из всех списков
+                previous_ids = set(new_conditions[condition_key][1])
+                ids = [el for el in ids if el in previous_ids]
+            resolved_keys.add(condition_key)
+            new_conditions[condition_key] = ("in", ids)
         return new_conditions
 
-    def translate_and_convert(self, value, direction: str="mapper2database", cache=None, save_unsaved=True, model_pool=None):
+    def translate_rows(self, rows: list, model_pool=None) -> list:
         """
-        Осуществляет непосредственное конвертирование данных из формата маппера в формат бд и наоборот
-        @param value: Объект для конвертации (может быть простым значением, списком, словарем)
+        Переводит в формат БД список словарей с данными записей (для вставки)
+        Данные документов проходят полную конвертацию, включая приведение к формату mongodb
+        @param rows: Список словарей с данными записей в терминах маппера
+        @type rows: list
+        @return: Список словарей с данными записей в терминах БД
+        @rtype : list
+
+        """
+        return [self.translate_and_convert(row, model_pool=model_pool) for row in rows]
+
+    def _translate_key(self, name, direction: str):
+        """
+        Переводит ключ словаря данных или условий выборки, оставляя служебное поле _id, если оно не описано в маппере
+        @param name: Ключ словаря
         @param direction: Направление конвертации
         @type direction: str
-        @param cache: Используемый в запросе объект-кэш
-        @return: Конвертированный объект
+        @return: Переведенный ключ
         """
+        if direction == "database2mapper" and name == "_id" and self.get_property_by_db_name(name) is None:
+            return name
+        return super()._translate_key(name, direction)
+
+    def _translate_and_convert_dict(self, value: dict, direction: str, cache, save_unsaved, model_pool):
+        """
+        Конвертирует словарь с данными документа или условиями выборки (см. translate_and_convert)
+        и приводит результат к формату обращения к одной коллекции и к формату условий mongodb
+        """
+        value = super()._translate_and_convert_dict(value, direction, cache, save_unsaved, model_pool)
+        value = self.convert_conditions_to_one_collection(value)
+        return self.to_mongo_conditions_format(value)
+
+    def _translate_and_convert_str(self, value: str, direction: str, cache, save_unsaved, model_pool):
+        """ Переводит обращение к полю, оставляя служебное поле _id, если оно не описано в маппере """
         if direction == "database2mapper" and value == "_id" and self.get_property_by_db_name(value) is None:
             return value
-
-        if isinstance(value, dict):
-            value = super().translate_and_convert(value, direction, cache, save_unsaved, model_pool=model_pool)
-            value = self.convert_conditions_to_one_collection(value)
-            value = self.to_mongo_conditions_format(value)
-        else:
-            value = super().translate_and_convert(value, direction, cache, save_unsaved, model_pool=model_pool)
-        return value
+        return super()._translate_and_convert_str(value, direction, cache, save_unsaved, model_pool)
 
     @staticmethod
     def to_mongo_conditions_format(conditions):
         """
         Преобразует словарь с сопоставлениями к формату, используемому в mongodb
+        Исходный словарь не изменяется
         @param conditions: Словарь с условиями
         @return: Преобразованный словарь
         """
-        for key in conditions:
+        converted = {}
+        for key, value in conditions.items():
             # Обрабатываем случае конъюнкции и дизъюнкции
-            if key in ["and", "or"]:
-                conditions["$%s" % key] = [NoSqlMapper.to_mongo_conditions_format(sub) for sub in conditions[key]]
-                del conditions[key]
-                continue
-
-            # Обрабатываем случай проверки наличия значения в поле
-            if type(conditions[key]) is tuple:
-                if conditions[key][0] == "exists":
-                    conditions[key] = ("ne" if conditions[key] else "e", None)
-
-            # Обрабатываем случай проверки вхождения подстроки в строку
-            if type(conditions[key]) is tuple:
-                if conditions[key][0] == "match":
-                    conditions[key] = ("regex", "^%s$" % conditions[key][1].replace("*", ".*"))
-
-            # Конвертируем все остальные операторы сравнения
-            if type(conditions[key]) is tuple:
-                conditions[key] = {"$%s" % conditions[key][0]: conditions[key][1]}
-        return conditions
+            if key == "and" or key == "or":
+                converted["$%s" % key] = [NoSqlMapper.to_mongo_conditions_format(sub) for sub in value]
+            elif type(value) is tuple:
+                operator, argument = value
+                if operator == "exists":
+                    # Проверка наличия значения в поле
+                    converted[key] = {"$ne": None}
+                elif operator == "match":
+                    # Проверка вхождения подстроки в строку
+                    converted[key] = get_match_pattern(argument)
+                else:
+                    # Все остальные операторы сравнения
+                    converted[key] = {"$%s" % operator: argument}
+            else:
+                converted[key] = value
+        return converted
 
 
 class FieldValues(object):
@@ -2372,50 +3193,54 @@ class FieldValues(object):
 
     # noinspection PyDocstring
     class ListValue(BaseValue, list, TrackChangesValue):
-        """ Специальный класс для замены обычных списков - возвращается при создании списков объектов моделей """
+        """
+        Специальный класс для замены обычных списков - возвращается при создании списков объектов моделей
+        Изменения не отслеживаются в каждом методе списка: при создании запоминается снимок элементов,
+        и is_changed() сравнивает с ним текущие элементы по идентичности только тогда, когда его вызывают
+        """
 
         def __init__(self, iterable=None):
             if iterable is None:
                 iterable = []
             list.__init__(self, iterable)
-            self.changed = False
+            self._snapshot = tuple(self)
+            self._dirty = False
 
         def is_changed(self):
-            return self.changed
-
-        def insert(self, i, v):
-            super().insert(i, v)
-            self.changed = True
-
-        def append(self, p_object):
-            super().append(p_object)
-            self.changed = True
-
-        def __delitem__(self, key):
-            super().__delitem__(key)
-            self.changed = True
-
-        def __setitem__(self, key, value):
-            super().__setitem__(key, value)
-            self.changed = True
-
-        def __add__(self, other):
-            super().__add__(other)
-            self.changed = True
-
-        def __iadd__(self, other):
-            super().__iadd__(other)
-            self.changed = True
-
-        def __imul__(self, other):
-            super().__imul__(other)
-            self.changed = True
+            return self._dirty or len(self) != len(self._snapshot) or not all(map(is_, self, self._snapshot))
+
+        def mark_changed(self):
+            """ Помечает список измененным (например, если изменилось состояние одного из его элементов) """
+            self._dirty = True
+
+        def __copy__(self):
+            clone = FieldValues.ListValue(self)
+            clone._snapshot, clone._dirty = self._snapshot, self._dirty
+            return clone
+
+        def __deepcopy__(self, memo):
+            from copy import deepcopy
+            clone = FieldValues.ListValue()
+            memo[id(self)] = clone
+            list.extend(clone, [deepcopy(it, memo) for it in self])
+            # Элементы копии - другие объекты, поэтому снимок строится заново, а признак изменения переносится
+            clone._snapshot, clone._dirty = tuple(clone), self.is_changed()
+            return clone
 
     class NoneValue(BaseValue):
-        """ Специальный класс для замены обычных пустых значений """
-        def __init__(self):
-            super().__init__()
-            self.changed = False
+        """
+        Специальный класс для замены обычных пустых значений
+        Состояния у пустого значения нет, поэтому все его экземпляры - один и тот же объект,
+        и проверка на пустое значение сводится к сравнению по идентичности
+        """
+        _instance = None
+
+        def __new__(cls):
+            instance = cls.__dict__.get("_instance")
+            if instance is None:
+                instance = object.__new__(cls)
+                cls._instance = instance
+            return instance
 
         def __getattribute__(self, item):
             if item in ["__class__", "__deepcopy__"]:
@@ -2445,55 +3270,56 @@ class FieldValues(object):
             pass
 
 
-class FNone(FieldValues.NoneValue):
-    """ Алиас для FieldValues.NoneValue для краткой записи внутри FieldTypesConverter """
+# Единственный экземпляр FieldValues.NoneValue для краткой записи внутри FieldTypesConverter
+# (конвертеры возвращают готовый объект, а не вызывают конструктор для каждого пустого значения)
+FNone = FieldValues.NoneValue()
 
 
 class FieldTypesConverter(object):
     """ Конвертер значений разных типов полей маппера """
 
     converters = {
-        ("Int", "Int"): lambda v, mf, cache, s, p: int(v) if None != v else FNone(),
-        ("Int", "String"): lambda v, mf, cache, s, p: str(v) if v else FNone(),
-        ("Int", "Date"): lambda v, mf, cache, s, p: date.fromtimestamp(v) if v else FNone(),
-        ("Int", "DateTime"): lambda v, mf, cache, s, p: datetime.fromtimestamp(v) if v else FNone(),
-        ("Int", "Time"): lambda v, mf, cache, s, p: FieldTypesConverter.int2time(v) if v else FNone(),
+        ("Int", "Int"): lambda v, mf, cache, s, p: int(v) if None != v else FNone,
+        ("Int", "String"): lambda v, mf, cache, s, p: str(v) if v else FNone,
+        ("Int", "Date"): lambda v, mf, cache, s, p: date.fromtimestamp(v) if v else FNone,
+        ("Int", "DateTime"): lambda v, mf, cache, s, p: datetime.fromtimestamp(v) if v else FNone,
+        ("Int", "Time"): lambda v, mf, cache, s, p: FieldTypesConverter.int2time(v) if v else FNone,
         ("Int", "Bool"): lambda v, mf, cache, s, p: v != 0,
-        ("Int", "Link"): lambda v, mf, cache, s, p: mf.get_new_item(p).load_by_primary(v, cache) if v else FNone(),
-        ("String", "String"): lambda v, mf, cache, s, p: str(v) if v else FNone(),
-        ("String", "Int"): lambda v, mf, cache, s, p: int(v.strip()) if v else FNone(),
-        ("String", "Float"): lambda v, mf, cache, s, p: float(v.strip()) if v else FNone(),
-        ("String", "Date"): lambda v, mf, cache, s, p: FieldTypesConverter.str2date(v) if v else FNone(),
-        ("String", "Time"): lambda v, mf, cache, s, p: FieldTypesConverter.str2time(v) if v else FNone(),
-        ("String", "DateTime"): lambda v, mf, cache, s, p: FieldTypesConverter.str2datetime(v) if v else FNone(),
-        ('String', 'Link'): lambda v, mf, cache, s, p: mf.get_new_item(p).load_by_primary(v, cache) if v else FNone(),
+        ("Int", "Link"): lambda v, mf, cache, s, p: mf.get_new_item(p).load_by_primary(v, cache) if v else FNone,
+        ("String", "String"): lambda v, mf, cache, s, p: str(v) if v else FNone,
+        ("String", "Int"): lambda v, mf, cache, s, p: int(v.strip()) if v else FNone,
+        ("String", "Float"): lambda v, mf, cache, s, p: float(v.strip()) if v else FNone,
+        ("String", "Date"): lambda v, mf, cache, s, p: FieldTypesConverter.str2date(v) if v else FNone,
+        ("String", "Time"): lambda v, mf, cache, s, p: FieldTypesConverter.str2time(v) if v else FNone,
+        ("String", "DateTime"): lambda v, mf, cache, s, p: FieldTypesConverter.str2datetime(v) if v else FNone,
+        ('String', 'Link'): lambda v, mf, cache, s, p: mf.get_new_item(p).load_by_primary(v, cache) if v else FNone,
         ("String", "List"): lambda v, mf, cache, s, p: FieldTypesConverter.from_list_to_special_type_list(mf, v, cache, p),
         ("String", "ReversedLink"): lambda v, mf, cache, s, p:  FieldTypesConverter.to_reversed_link(mf, v, cache, p),
         ("String", "ObjectID"): lambda v, mf, cache, s, p:  v,
         ("Bytes", "Bytes"): lambda v, mf, cache, s, p: v,
-        ("Float", "Float"): lambda v, mf, cache, s, p: float(v) if None != v else FNone(),
-        ("Float", "String"): lambda v, mf, cache, s, p: str(v) if None != v else FNone(),
+        ("Float", "Float"): lambda v, mf, cache, s, p: float(v) if None != v else FNone,
+        ("Float", "String"): lambda v, mf, cache, s, p: str(v) if None != v else FNone,
         ("Float", "Int"): lambda v, mf, cache, s, p: int(v),
-        ("Bool", "Bool"): lambda v, mf, cache, s, p: v if v else FNone(),
+        ("Bool", "Bool"): lambda v, mf, cache, s, p: v if v else FNone,
         ("Bool", "Int"): lambda v, mf, cache, s, p: 1 if v else 0,
         ("Date", "Date"): lambda v, mf, cache, s, p: v,
-        ("Date", "Int"): lambda v, mf, cache, s, p: int(time.mktime(v.timetuple())) if v else FNone(),
-        ("Date", "String"): lambda v, mf, cache, s, p: v.isoformat() if v else FNone(),
-        ("Date", "DateTime"): lambda v, mf, cache, s, p: datetime(v.year, v.month, v.day) if v else FNone(),
+        ("Date", "Int"): lambda v, mf, cache, s, p: FieldTypesConverter.date2int(v) if v else FNone,
+        ("Date", "String"): lambda v, mf, cache, s, p: v.isoformat() if v else FNone,
+        ("Date", "DateTime"): lambda v, mf, cache, s, p: datetime(v.year, v.month, v.day) if v else FNone,
         ("Time", "Time"): lambda v, mf, cache, s, p: v,
-        ("Time", "Int"): lambda v, mf, cache, s, p: (v.hour * 3600 + v.minute*60 + v.second) if v else FNone(),
-        ("Time", "String"): lambda v, mf, cache, s, p: v.strftime("%H:%M:%S") if v else FNone(),
-        ("DateTime", "DateTime"): lambda v, mf, cache, s, p: v if v else FNone(),
-        ("DateTime", "String"): lambda v, mf, cache, s, p: v.strftime("%Y-%m-%d %H:%M:%S") if v else FNone(),
-        ("DateTime", "Int"): lambda v, mf, cache, s, p: int(time.mktime(v.timetuple())) if v else FNone(),
-        ("DateTime", "Date"): lambda v, mf, cache, s, p: date(v.year, v.month, v.day) if v else FNone(),
+        ("Time", "Int"): lambda v, mf, cache, s, p: (v.hour * 3600 + v.minute*60 + v.second) if v else FNone,
+        ("Time", "String"): lambda v, mf, cache, s, p: v.strftime("%H:%M:%S") if v else FNone,
+        ("DateTime", "DateTime"): lambda v, mf, cache, s, p: v if v else FNone,
+        ("DateTime", "String"): lambda v, mf, cache, s, p: v.strftime("%Y-%m-%d %H:%M:%S") if v else FNone,
+        ("DateTime", "Int"): lambda v, mf, cache, s, p: FieldTypesConverter.datetime2int(v) if v else FNone,
+        ("DateTime", "Date"): lambda v, mf, cache, s, p: date(v.year, v.month, v.day) if v else FNone,
         ("Link", "Int"): lambda v, mf, cache, s, p:
-        (v.save().primary.get_value(deep=True) if s else v.primary.get_value(deep=True)) if v else FNone(),
+        (v.save().primary.get_value(deep=True) if s else v.primary.get_value(deep=True)) if v else FNone,
         ("Link", "String"): lambda v, mf, cache, s, p:
-        str((v.save().primary.get_value(deep=True) if s else v.primary.get_value(deep=True))) if v else FNone(),
-        ("Link", "Link"): lambda v, mf, cache, s, p: v if v else FNone(),
+        str((v.save().primary.get_value(deep=True) if s else v.primary.get_value(deep=True))) if v else FNone,
+        ("Link", "Link"): lambda v, mf, cache, s, p: v if v else FNone,
         ("Link", "ObjectID"): lambda v, mf, cache, s, p:
-        (v.save().primary.get_value(deep=True) if s else v.primary.get_value(deep=True)) if v else FNone(),
+        (v.save().primary.get_value(deep=True) if s else v.primary.get_value(deep=True)) if v else FNone,
         ("List", "String"): lambda v, mf, cache, s, p: FieldTypesConverter.from_list_to_special_type_list(mf, v, cache, p),
         ("List", "ObjectID"): lambda v, mf, cache, s, p:
         [(it.save().primary.get_value(deep=True) if s else it.primary.get_value(deep=True))
@@ -2505,7 +3331,7 @@ class FieldTypesConverter(object):
         ("EmbeddedDocument", "EmbeddedList"): lambda v, mf, cache, s, p:
         FieldValues.ListValue([FieldTypesConverter.from_embedded(mf, i, p) for i in v] if v else []),
         ("ObjectID", "List"): lambda v, mf, cache, s, p: FieldTypesConverter.from_list_to_special_type_list(mf, v, cache, p),
-        ("ObjectID", "Link"): lambda v, mf, cache, s, p: mf.get_new_item(p).load_by_primary(v, cache) if v else FNone(),
+        ("ObjectID", "Link"): lambda v, mf, cache, s, p: mf.get_new_item(p).load_by_primary(v, cache) if v else FNone,
         ("ObjectID", "ReversedLink"): lambda v, mf, cache, s, p: FieldTypesConverter.to_reversed_link(mf, v, cache, p),
         ("ObjectID", "ObjectID"): lambda v, mf, cache, s, p: v,
         ("Unknown", "String"): lambda v, mf, cache, s, p: str(v),
@@ -2538,7 +3364,7 @@ class FieldTypesConverter(object):
         ("Int", "EmbeddedObject"): lambda v, mf, cache, s, p: mf.model(v) if v else None,
         ("String", "EmbeddedObject"): lambda v, mf, cache, s, p: mf.model(v) if v else None,
 
-        ("Enum", "Enum"): lambda v, mf, *args: v.value if isinstance(v, Enum) else (mf.model(v) if v else FNone()),
+        ("Enum", "Enum"): lambda v, mf, *args: v.value if isinstance(v, Enum) else (mf.model(v) if v else FNone),
         ("Enum", "Repr"): lambda v, mf, *args: str(v),
         ("Enum", "Int"): lambda v, mf, *args: int(v.value),
         ("Enum", "Bool"): lambda v, mf, *args: bool(v.value),
@@ -2551,9 +3377,17 @@ class FieldTypesConverter(object):
         ("String", "Enum"): lambda v, mf, *args: mf.model(v),
         ("Unknown", "Enum"): lambda v, mf, *args: mf.model(v),
         ("Json", "Json"): lambda v, mf, cache, s, p: (
-            json.loads(v) if isinstance(v, str) else json.dumps(v)) if None != v else FNone(),
+            json.loads(v) if isinstance(v, str) else json.dumps(v)) if None != v else FNone,
     }
 
+    # Конвертеры значений EmbeddedObject, уже выбранные в custom_types: {(класс поля, класс объекта, целевой тип): конвертер}
+    custom_converters = {}
+
+    # Строки фиксированных форматов даты и времени из ASCII-цифр: их значения разбираются без strptime
+    date_format = re.compile(r"(\d{4})-(\d{2})-(\d{2})", re.ASCII)
+    time_format = re.compile(r"(\d{2}):(\d{2}):(\d{2})", re.ASCII)
+    datetime_format = re.compile(r"(\d{4})-(\d{2})-(\d{2}) (\d{2}):(\d{2}):(\d{2})", re.ASCII)
+
     @staticmethod
     def str2date(value: str) -> date:
         """
@@ -2564,19 +3398,33 @@ class FieldTypesConverter(object):
         @rtype : date
 
         """
+        # Строки формата YYYY-MM-DD разбираются без strptime, остальные (и неверные даты) - им, ради его ошибок
+        parts = FieldTypesConverter.date_format.fullmatch(value)
+        if parts:
+            try:
+                return date(*map(int, parts.groups()))
+            except ValueError:
+                pass
         value = datetime.strptime(value, "%Y-%m-%d")
         return date(value.year, value.month, value.day)
 
     @staticmethod
-    def str2time(value: str) -> time:
+    def str2time(value: str) -> dtime:
         """
         Конвертирует строковое представление даты к объекту времени
         @param value: Строковое представление времени
         @type value: str
-        @return: Дата
-        @rtype : time
+        @return: Время
+        @rtype : dtime
 
         """
+        # Строки формата HH:MM:SS разбираются без strptime
+        parts = FieldTypesConverter.time_format.fullmatch(value)
+        if parts:
+            try:
+                return dtime(*map(int, parts.groups()))
+            except ValueError:
+                pass
         value = time.strptime(value, "%H:%M:%S")
         return dtime(value.tm_hour, value.tm_min, value.tm_sec)
 
@@ -2590,6 +3438,13 @@ class FieldTypesConverter(object):
         @rtype : datetime
 
         """
+        # Строки формата YYYY-MM-DD HH:MM:SS разбираются без strptime
+        parts = FieldTypesConverter.datetime_format.fullmatch(value)
+        if parts:
+            try:
+                return datetime(*map(int, parts.groups()))
+            except ValueError:
+                pass
         value = time.strptime(value, "%Y-%m-%d %H:%M:%S")
         return datetime(value.tm_year, value.tm_mon, value.tm_mday, value.tm_hour, value.tm_min, value.tm_sec)
 
@@ -2603,10 +3458,39 @@ class FieldTypesConverter(object):
         @rtype : datetime
 
         """
-        hours = int(value / 3600)
-        minutes = int((value - (hours * 3600)) / 60)
-        seconds = value - (hours * 3600) - (minutes * 60)
-        return dtime(int(hours), int(minutes), int(seconds))
+        # Целочисленное деление вместо деления с плавающей точкой и обратного приведения к int
+        minutes, seconds = divmod(int(value), 60)
+        hours, minutes = divmod(minutes, 60)
+        return dtime(hours, minutes, seconds)
+
+    @staticmethod
+    def date2int(value: date) -> int:
+        """
+        Конвертирует дату в количество секунд от начала эпохи до начала этих суток по местному времени
+        (как time.mktime, но без построения кортежа времени)
+        @param value: Дата
+        @type value: date
+        @return: Количество секунд
+        @rtype : int
+
+        """
+        if not isinstance(value, datetime):
+            value = datetime(value.year, value.month, value.day)
+        return FieldTypesConverter.datetime2int(value)
+
+    @staticmethod
+    def datetime2int(value: datetime) -> int:
+        """
+        Конвертирует дату и время в количество целых секунд от начала эпохи
+        Время без часового пояса считается местным (как в time.mktime), с часовым поясом - учитывает его
+        @param value: Дата и время
+        @type value: datetime
+        @return: Количество секунд
+        @rtype : int
+
+        """
+        # Доли секунды отбрасываются вниз, как и в time.mktime, который их не учитывает
+        return math.floor(value.timestamp())
 
     @staticmethod
     def to_reversed_link(mf: FieldTypes.SqlReversedLink, v, cache, p) -> RecordModel:
@@ -2646,18 +3530,22 @@ class FieldTypesConverter(object):
 
         """
         v = FieldTypesConverter.handle_none_value_for_list_types(v, mf)
-        if mf.get_items_collection_mapper().primary.compound:
-            v = [
-                dict(zip(mf.get_items_collection_mapper().primary.name(), val.split("$!")))
-                for val in filter(lambda val: val not in [None, ""], v)
-                if type(val) in [str, int]
-            ]
+        # Повторы убираются словарем с сохранением порядка (линейно, а не квадратично от длины списка)
+        primary = mf.get_items_collection_mapper().primary
+        if primary.compound:
+            names = primary.name()
+            # Значения составных ключей - словари, они не хэшируемы, поэтому повторы ищутся по кортежам их значений
+            unique = list({
+                key: dict(zip(names, key))
+                for key in (tuple(val.split("$!")) for val in v if val not in [None, ""] and type(val) in [str, int])
+            }.values())
         else:
-            v = filter(None, v)
-        unique = []
-        for i in v:
-            if i not in unique:
-                unique.append(i)
+            unique = list(dict.fromkeys(filter(None, v)))
+        if cache is None and len(unique) > 1:
+            # Без кэша каждая модель списка загружалась бы отдельным запросом при первом обращении к ней,
+            # поэтому ключи передаются в общий кэш - все модели списка загрузятся одним запросом
+            cache = TableModelCache(mf.get_items_collection_mapper(), p)
+            cache.cache_primaries(mf.get_items_collection_mapper(), unique)
 
         return FieldValues.ListValue([mf.get_new_item(p).load_by_primary(objid, cache) for objid in unique])
 
@@ -2684,19 +3572,26 @@ class FieldTypesConverter(object):
 
     @staticmethod
     def embedded(mf, v, p):
-        return mf.get_new_item(p).mapper.translate_and_convert(v.get_data(), model_pool=p) if v else FNone()
+        return mf.get_new_item(p).mapper.translate_and_convert(v.get_data(), model_pool=p) if v else FNone
 
     @staticmethod
     def from_embedded(mf, v, p):
         return mf.get_new_item(p).load_from_array(
             mf.get_new_item(p).mapper.translate_and_convert(v, "database2mapper", model_pool=p), consider_as_unchanged=True
-        ) if v else FNone()
+        ) if v else FNone
 
     @staticmethod
     def custom_types(v, mf, cache, s, target_type, p):
         if not v:
             return None
-        target_lambda = FieldTypesConverter.converters.get(
-            (mf.get_value_type_in_mapper_terms(v.get_value_type()).ident, target_type)
-        )
+        # Тип хранимого значения определяется классом объекта, а соответствие типов - классом поля,
+        # поэтому выбранный конвертер запоминается для тройки (класс поля, класс объекта, целевой тип)
+        key = (type(mf), type(v), target_type)
+        target_lambda = FieldTypesConverter.custom_converters.get(key)
+        if target_lambda is None:
+            target_lambda = FieldTypesConverter.converters.get(
+                (mf.get_value_type_in_mapper_terms(v.get_value_type()).ident, target_type)
+            )
+            if target_lambda is not None:
+                FieldTypesConverter.custom_converters[key] = target_lambda
         return target_lambda(v.get_value(), mf, cache, s, p)
\ No newline at end of file
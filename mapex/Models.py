@@ -6,6 +6,7 @@ from .Exceptions import TableModelException, EmbeddedObjectFactoryException
 from .Common import TrackChangesValue, ValueInside
 from .Utils import do_dict, merge_dict
 from collections import OrderedDict
+from itertools import islice
 import weakref
 import re
 import json
@@ -15,6 +16,8 @@ import base64
 class TableModel(object):
     """ Класс создания моделей таблиц БД """
     mapper = None
+    # Количество строк generate_items(), связанные модели которых загружаются вместе
+    eager_loading_page = 100
 
     def __init__(self, *boundaries, pool=None):
         self._pool = pool
@@ -93,15 +96,45 @@ class TableModel(object):
         :param data:    Данные для вставки в коллекцию
         """
         self.check_incoming_data(data)
-        return [self._insert_one(item) for item in data] if (type(data) is list) else self._insert_one(data)
+        return self._insert_many(data) if (type(data) is list) else self._insert_one(data)
+
+    def save_new_items(self, items: list):
+        """
+        Сохраняет новые модели коллекции одной вставкой так же, как RecordModel.save() сохраняет новую модель:
+        записи добавляются многострочными запросами, когда маппер это позволяет
+        :param items:   Список новых моделей
+        :return: list:  Сохраненные модели
+        """
+        if items and not self.mapper.is_mock:
+            for item in items:
+                item.primary.ensure_exists()
+                item._loaded_from_db = True
+            try:
+                self.insert(items)
+            except Exception as err:
+                for item in items:
+                    item._loaded_from_db = False
+                raise err
+        for item in items:
+            item.up_to_date()
+        return items
 
     def _insert_one(self, item):
         """ Вставка записи без выполнения проверок """
-        model_data = item.get_data_for_write_operation()
-        model = item
-
-        flat_data, lists_objects = self.mapper.split_data_by_relation_type(model_data)
-        last_record = self.mapper.insert(flat_data, model_pool=self.pool)
+        flat_data, lists_objects = self.mapper.split_data_by_relation_type(item.get_data_for_write_operation())
+        return self._after_insert(item, self.mapper.insert(flat_data, model_pool=self.pool), lists_objects)
+
+    def _insert_many(self, items):
+        """ Вставка нескольких записей без выполнения проверок. Записи вставляются пачками, если маппер это позволяет """
+        splitted = [self.mapper.split_data_by_relation_type(item.get_data_for_write_operation()) for item in items]
+        last_records = self.mapper.insert_many([flat_data for flat_data, lists_objects in splitted], model_pool=self.pool)
+        return [
+            self._after_insert(item, last_record, lists_objects)
+            for item, last_record, (flat_data, lists_objects) in zip(items, last_records, splitted)
+        ]
+
+    def _after_insert(self, model, last_record, lists_objects):
+        """ Сохраняет в модели значение первичного ключа добавленной записи и связывает с ней объекты списков """
         if self.mapper.primary.exists():
             model.primary.set_value(last_record)
             with UpdateLock(model):
@@ -140,9 +173,12 @@ class TableModel(object):
                 flat_data = {key: flat_data[key] for key in flat_data if conditions.get(key, "&bzx") != flat_data[key]}
 
         # Сохраняем записи в основной таблице
-        changed_models_pkeys = self.mapper.update(flat_data, conditions, params, model_pool=self.pool)
+        # Ключи обновленных записей нужны только для привязки объектов списков
+        changed_models_pkeys = self.mapper.update(
+            flat_data, conditions, params, model_pool=self.pool, return_ids=lists_objects != {}
+        )
 
-        if len(changed_models_pkeys) > 0 and lists_objects != {}:
+        if lists_objects != {} and len(changed_models_pkeys) > 0:
             if model:
                 items_to_update = [model]
             elif self.mapper.primary.compound:
@@ -186,23 +222,56 @@ class TableModel(object):
             raise TableModelException("there is more than one item affected by get_item() method")
         return items[0] if length > 0 else None
 
-    def get_items(self, bounds=None, params=None):
+    def get_items(self, bounds=None, params=None, properties=None):
         """
         Возвращает список экзепляров класса RecordModel, соответствующих условиями выборки из коллекции
         :param bounds:              Условия выборки записей
         :param params:              Параметры выборки (сортировка, лимит)
+        :param properties:          Загружаемые сразу поля (по умолчанию - все). Остальные поля модели
+                                    загружаются одним запросом при первом обращении к любому из них
         :return: :raise:            TableModelException
         """
         cache = TableModelCache(self.mapper, self.pool)
-        generator = self.mapper.get_rows([], self.mix_boundaries(bounds), params, cache, model_pool=self.pool)
+        fields = self.get_projection(properties)
+        generator = self.mapper.get_rows(fields, self.mix_boundaries(bounds), params, cache, model_pool=self.pool)
+        self.check_item_mapper()
+        return self._items_from_rows(list(generator), cache, fields)
+
+    def get_projection(self, properties=None) -> list:
+        """
+        Возвращает список полей выборки: запрошенные поля и поля первичного ключа
+        :param properties:          Запрошенные поля
+        :return:                    Список полей или пустой список, если нужно загрузить все поля
+        """
+        if not properties or not self.mapper.primary.exists():
+            return []
+        primary = self.mapper.primary.name()
+        primary = primary if isinstance(primary, list) else [primary]
+        return list(properties) + [name for name in primary if name not in properties]
+
+    def check_item_mapper(self):
+        """ Проверяет, что элементы коллекции используют тот же маппер, что и сама коллекция """
         if isinstance(self.get_new_item().mapper, self.mapper.__class__) is False:
             raise TableModelException("Collection mapper and collection item mapper should be equal")
-        arrays, items = [], []
-        for row in generator:
-            arrays.append(row)
-            item = self.mapper.factory_method(self.get_new_item().load_from_array(row, consider_as_unchanged=True))
-            items.append(item)
-        cache.cache(arrays)
+
+    def _items_from_rows(self, rows, cache, fields=None):
+        """
+        Создаёт модели из строк выборки и заполняет кэш связанных моделей:
+        при первом обращении к связи любой из этих моделей связанные модели всех строк загрузятся одним запросом
+        :param rows:                Строки выборки
+        :param cache:               Кэш, которым связаны строки выборки
+        :param fields:              Поля, которые были выбраны (по умолчанию - все)
+        :return: list:              Список моделей
+        """
+        items = [
+            self.mapper.factory_method(self.get_new_item().load_from_array(row, consider_as_unchanged=True))
+            for row in rows
+        ]
+        unloaded = set(self.mapper.get_properties()) - set(fields) if fields else None
+        if unloaded:
+            for item in items:
+                item.defer_load(unloaded)
+        cache.cache(rows)
         return items
 
     def pretty_print(self, bounds=None, params=None, properties=None, bytes_len=10):
@@ -242,18 +311,30 @@ class TableModel(object):
         table.align = 'l'
         print(str(self.__class__) + '\n' + str(table))
 
-    def generate_items(self, bounds=None, params=None):
+    def generate_items(self, bounds=None, params=None, properties=None):
         """
         Генератор экзепляров класса RecordModel, соответствующих условиями выборки из коллекции
+        Строки обрабатываются страницами по eager_loading_page штук: связанные модели всех строк страницы
+        загружаются одним запросом при первом обращении к связи любой из них.
+        Кэш связанных моделей хранит только текущую страницу
         :param bounds:              Условия выборки записей
         :param params:              Параметры выборки (сортировка, лимит)
+        :param properties:          Загружаемые сразу поля (по умолчанию - все)
         :return: :raise:            TableModelException
         """
-        if isinstance(self.get_new_item().mapper, self.mapper.__class__) is False:
-            raise TableModelException("Collection mapper and collection item mapper should be equal")
-
-        for row in self.mapper.generate_rows([], self.mix_boundaries(bounds), params, model_pool=self.pool):
-            yield self.mapper.factory_method(self.get_new_item().load_from_array(row, consider_as_unchanged=True))
+        self.check_item_mapper()
+
+        cache, rows = TableModelCache(self.mapper, self.pool), []
+        fields = self.get_projection(properties)
+        for row in self.mapper.generate_rows(fields, self.mix_boundaries(bounds), params, cache, model_pool=self.pool):
+            rows.append(row)
+            if len(rows) >= self.eager_loading_page:
+                for item in self._items_from_rows(rows, cache, fields):
+                    yield item
+                rows = []
+                cache.clear()
+        for item in self._items_from_rows(rows, cache, fields):
+            yield item
 
 
 class Primary(ValueInside):
@@ -376,6 +457,7 @@ class RecordModel(ValueInside, TrackChangesValue):
     def __init__(self, data=None, loaded_from_db=False, pool=None):
         self._pool = pool
         self._lazy_load = False
+        self._unloaded = None
         self._changed = True
         # weakref.proxy решает проблему циклической связанности между экземплярами Primary и RecordModel
         self.primary = Primary(weakref.proxy(self))
@@ -559,15 +641,40 @@ class RecordModel(ValueInside, TrackChangesValue):
                 del data[self.mapper.primary.name()]
         return self.load_from_array(data, consider_as_unchanged=True) if data else None
 
+    def defer_load(self, properties):
+        """
+        Откладывает загрузку полей properties до первого обращения к любому из них.
+        Обращения к остальным полям модели загрузку не вызывают
+        :param properties: Имена незагруженных полей
+        """
+        self._unloaded = set(properties)
+        self._lazy_load = lambda: self.partial_load(list(properties))
+
+    def partial_load(self, properties):
+        """
+        Загружает из БД значения незагруженных полей модели
+        @param properties: Имена полей для загрузки
+        @return Ссылка на текущую модель
+        @rtype : RecordModel
+
+        """
+        self._unloaded = None
+        data = self.mapper.get_row(properties, self.primary.to_dict(), model_pool=self.pool)
+        return self.load_from_array(data, consider_as_unchanged=True) if data else None
+
     def cache_load(self, cache):
         """
         Выполняет инициализацию с помощью кэша
+        Если в кэше данных модели нет (например, generate_items() уже очистил кэш прошлой страницы),
+        модель загружается обычным запросом
         @param cache: Кэш
         @return Ссылка на текущую модель
         @rtype : RecordModel
 
         """
         data = cache.get(self.mapper, self.primary.get_value(deep=True))
+        if not data:
+            return self.normal_load()
 
         # Первичный ключ не перезагружается чтобы не потерять изменения если ключ - это модель другой коллекции
         if data and self.mapper.primary.exists():
@@ -576,7 +683,7 @@ class RecordModel(ValueInside, TrackChangesValue):
                     del data[pkey]
             elif self.mapper.primary.name() in data:
                 del data[self.mapper.primary.name()]
-        return self.load_from_array(data, consider_as_unchanged=True) if data else None
+        return self.load_from_array(data, consider_as_unchanged=True)
 
     def exec_lazy_loading(self):
         """ Если объект проиницилиазирован отложенно - вызывает инициализацию """
@@ -674,7 +781,7 @@ class RecordModel(ValueInside, TrackChangesValue):
     def __setattr__(self, name, val):
         """ При любом изменении полей модели необходимо инициализировать модель """
         mapper = object.__getattribute__(self, "__dict__").get("mapper")
-        if mapper and name in mapper.get_properties():
+        if mapper and mapper.has_property(name):
             self.exec_lazy_loading()
             self.mark_as_changed()
         object.__setattr__(self, name, val)
@@ -718,10 +825,13 @@ class RecordModel(ValueInside, TrackChangesValue):
 
     def __getattribute__(self, name):
         """ При любом обращении к полям модели необходимо инициализировать модель """
-        mapper = object.__getattribute__(self, "__dict__").get("mapper")
+        instance_dict = object.__getattribute__(self, "__dict__")
+        mapper = instance_dict.get("mapper")
         # Список полей первичного ключа
-        if mapper and name in mapper.get_properties() and name not in self.primary.to_list():
-            self.exec_lazy_loading()
+        if mapper and mapper.has_property(name) and name not in self.primary.to_list():
+            unloaded = instance_dict.get("_unloaded")
+            if unloaded is None or name in unloaded:
+                self.exec_lazy_loading()
 
         if name == "validate":
             return object.__getattribute__(self, "recursive_validate")
@@ -813,16 +923,18 @@ class TableModelCache(object):
         :param primary_id:   Значение первичного ключа
         """
         primary_id = primary_id.get_value(deep=True) if isinstance(primary_id, ValueInside) else primary_id
+        if self._ids_cache.get(model_type):
+            self._cache.setdefault(model_type, {}).update(self._get_mapper_cache(model_type))
+            del self._ids_cache[model_type]
         model_cache = self._cache.get(model_type)
         if model_cache:
-            if type(model_cache) is not dict:
-                self._cache[model_type] = self._cache[model_type](model_type)
-                return self._cache[model_type].get(json.dumps(primary_id) if isinstance(primary_id, dict) else primary_id)
             return model_cache.get(json.dumps(primary_id) if isinstance(primary_id, dict) else primary_id)
 
     def cache(self, rows):
         """
         Выполняет кэширование для будущего использования
+        Может вызываться многократно: первичные ключи новых строк накапливаются и загружаются
+        одним запросом при первом обращении к данным соответствующего типа
         :param rows:    Список строк для кэширования
         """
         # Сперва получим имена итересующих нас полей (Кэшируются только данные для полей Link и List)
@@ -844,22 +956,64 @@ class TableModelCache(object):
 
         for mapper in cache:
             if len(cache[mapper]) > 0:
-                self._ids_cache[mapper] = cache[mapper]
-                self._cache[mapper] = self._get_mapper_cache
+                self._ids_cache.setdefault(mapper, []).extend(cache[mapper])
+
+    def cache_primaries(self, mapper, ids):
+        """
+        Добавляет к кэшированию первичные ключи моделей маппера mapper
+        Модели загрузятся одним запросом (пачками) при первом обращении к данным любой из них
+        :param mapper:  Маппер моделей
+        :param ids:     Список значений первичных ключей
+        """
+        if len(ids) > 0:
+            self._ids_cache.setdefault(mapper, []).extend(ids)
+
+    def clear(self):
+        """
+        Забывает загруженные данные и накопленные первичные ключи, чтобы кэш не рос вместе с выборкой
+        Модели, созданные до очистки, загрузят свои связи отдельными запросами
+        """
+        self._cache = {}
+        self._ids_cache = {}
 
     def _get_mapper_cache(self, m):
-        """ Собирает кэш маппера из внешней переменной cache """
+        """
+        Собирает кэш маппера для накопленных первичных ключей, загружая их пачками по m.batch_fetch_size
+        (по умолчанию - одним запросом, если ключей не больше, чем адаптер допускает параметров в запросе)
+        """
         mapper_cache = {}
-        if m.primary.compound:
-            for item in m.get_new_collection(model_pool=self._pool).get_items({"or": self._ids_cache[m]}):
-                key = item.primary.get_value(deep=True)
-                mapper_cache[json.dumps(key)] = item.get_data()
-        else:
-            for item in m.get_new_collection(model_pool=self._pool).get_items({m.primary.name(): ("in", self._ids_cache[m])}):
-                key = item.primary.get_value(deep=True)
-                mapper_cache[key] = item.get_data()
+        ids = iter(self._ids_cache[m])
+        collection = m.get_new_collection(model_pool=self._pool)
+        size = m.batch_fetch_size or self._get_batch_limit(collection)
+        for batch in iter(lambda: list(islice(ids, size)), []):
+            mapper_cache.update(self._fetch_batch(collection, batch))
         return mapper_cache
 
+    @staticmethod
+    def _get_batch_limit(collection):
+        """
+        Возвращает, сколько первичных ключей коллекции помещается в один запрос по ограничению адаптера
+        на количество параметров запроса, или None, если адаптер такого ограничения не задает
+        """
+        limit = getattr(collection.pool.db, "max_query_params", None)
+        if limit and collection.mapper.primary.compound:
+            limit //= len(collection.mapper.primary.name())
+        return max(1, limit) if limit else None
+
+    @staticmethod
+    def _fetch_batch(collection, batch):
+        """ Загружает данные моделей коллекции для пачки первичных ключей """
+        m = collection.mapper
+        if m.primary.compound:
+            return {
+                json.dumps(item.primary.get_value(deep=True)): item.get_data()
+                for item in collection.get_items({"or": batch})
+            }
+        return {
+            item.primary.get_value(deep=True): item.get_data()
+            for item in collection.get_items({m.primary.name(): ("in", batch)})
+        }
+
 
 class Transaction(object):
     def __init__(self, pool):
@@ -1,5 +1,7 @@
-from queue import Queue, Empty
-from threading import local
+import weakref
+from collections import deque
+from threading import local, Lock, Event, Thread
+from time import monotonic
 
 from .Sql import Adapter
 from .Models import Transaction
@@ -9,24 +11,75 @@ class TooManyConnectionsError(Exception):
     """ Нет возможности создать подключение к базе данных из-за превышения ограничения на количество соединений с БД """
 
 
+class _Waiter(object):
+    """
+    Поток, ожидающий соединения. Освобождающийся ресурс передаётся первому ожидающему напрямую:
+    либо готовое соединение в connection, либо (connection остаётся None) право открыть новое соединение
+    """
+    __slots__ = ("event", "connection")
+
+    def __init__(self):
+        self.event = Event()
+        self.connection = None
+
+
+class _HotSlotOwner(object):
+    """
+    Объект, который хранится только в локальных данных потока. Когда поток завершается, объект уничтожается,
+    и пул удаляет слот этого потока (см. Pool._drop_hot_slot)
+    """
+    __slots__ = ("__weakref__",)
+
+
 class Pool(object):
     """ Пул адаптеров баз данных """
-    def __init__(self, adapter: type, dsn: tuple, min_connections: int=1):
+    def __init__(self, adapter: type, dsn: tuple, min_connections: int=1, max_connections: int=None,
+                 timeout: float=None, use_lifo: bool=True, max_idle: int=None,
+                 pre_ping: bool=False, recycle: float=None):
         """
         Конструктор пула
         @param adapter: класс адаптера
         @param dsn: параметры подключения к БД
         @param min_connections: число минимально поддерживаемых в пуле соединений
+        @param max_connections: максимальное число соединений, открываемых пулом (None - без ограничений)
+        @param timeout: время ожидания свободного соединения в секундах, когда лимит исчерпан (None - ждать всегда)
+        @param use_lifo: выдавать первым последнее возвращённое соединение (его серверные кэши ещё "тёплые")
+        @param max_idle: сколько простаивающих соединений держать в пуле, лишние закрываются (None - все)
+        @param pre_ping: проверять простаивавшее соединение перед выдачей (мёртвое закрывается и заменяется)
+        @param recycle: через сколько секунд после подключения соединение закрывается вместо выдачи (None - никогда)
         @return: Pool
         """
         assert min_connections >= 0
+        assert max_connections is None or max_connections >= max(min_connections, 1)
+        assert max_idle is None or max_idle >= min_connections
+        assert recycle is None or recycle > 0
         assert dsn
 
-        self._pool = Queue()
+        self._idle = deque()
+        self._lock = Lock()
         self._adapter = adapter
         self._dsn = dsn
         self._min_connections = min_connections
+        self._max_connections = max_connections
+        self._max_idle = max_idle
+        self._timeout = timeout
+        self._use_lifo = use_lifo
+        # Слоты потоков работают без блокировок, поэтому при ограничении простаивающих соединений не используются:
+        # иначе число простаивающих нельзя проверить атомарно
+        self._use_hot_slots = use_lifo and max_idle is None
+        self._pre_ping = pre_ping
+        self._recycle = recycle
+        self._opened = 0
+        # Очередь ожидающих потоков: соединения раздаются строго в порядке очереди
+        self._waiters = deque()
+        # Реестр слотов живых потоков: меняется только при первом обращении нового потока, при завершении потока
+        # и под отдельной блокировкой, а читается без блокировок - кортеж заменяется целиком
+        self._hot_slots = ()
+        self._hot_slots_lock = Lock()
+        # Заранее созданные, но не подключенные адаптеры: закрытые пулом адаптеры тоже возвращаются сюда
+        self._spare = [adapter() for i in range(max_connections or 0)]
         self._local = local()
+        self._preopen_connections()
 
     @property
     def in_transaction(self):
@@ -44,35 +97,276 @@ class Pool(object):
         """ Новое соединение к базе данных или False
         @return: Adapter | False
         """
-        return self._adapter().connect(self._dsn, autocommit)
+        try:
+            adapter = self._spare.pop()
+        except IndexError:
+            adapter = self._adapter()
+        connection = adapter.connect(self._dsn, autocommit)
+        if not connection:
+            self._spare.append(adapter)
+        return connection
+
+    def _close_connection(self, db: Adapter):
+        """ Закрывает соединение, а сам адаптер оставляет для повторного использования """
+        db.close()
+        db.stop_logging()
+        self._spare.append(db)
 
     @property
-    def _connection_from_pool(self):
-        """ Соединение из пула или False
+    def _hot_slot(self) -> list:
+        """
+        Слот потока для последнего возвращённого им соединения.
+        Слот - это список не более чем из одного элемента: list.append() и list.pop() атомарны,
+        поэтому из слота можно брать соединение без блокировки пула (в том числе из других потоков)
+        """
+        slot = getattr(self._local, "hot_slot", None)
+        if slot is None:
+            slot = self._local.hot_slot = []
+            owner = self._local.hot_slot_owner = _HotSlotOwner()
+            # Пул не удерживается финализатором, а при выходе из программы слоты уже не нужны
+            weakref.finalize(owner, Pool._drop_hot_slot, weakref.ref(self), slot).atexit = False
+            with self._hot_slots_lock:
+                self._hot_slots += (slot,)
+        return slot
+
+    @staticmethod
+    def _drop_hot_slot(pool_ref, slot: list):
+        """
+        Удаляет слот завершившегося потока из реестра, а оставленное в нём соединение возвращает в пул
+        @param pool_ref: Слабая ссылка на пул
+        @param slot: Слот потока
+        """
+        pool = pool_ref()
+        if pool is None:
+            return
+        with pool._hot_slots_lock:
+            pool._hot_slots = tuple(other for other in pool._hot_slots if other is not slot)
+        try:
+            db = slot.pop()
+        except IndexError:
+            return
+        pool._put_back(db)
+
+    def _steal_hot(self):
+        """ Забирает соединение, оставленное в слоте какого-либо потока, или False
+        @return: Adapter | False
+        """
+        for slot in self._hot_slots:
+            try:
+                return slot.pop()
+            except IndexError:
+                pass
+        return False
+
+    def _pop_idle(self):
+        """ Простаивающее соединение из пула или False. Вызывается под блокировкой пула
+        @return: Adapter | False
+        """
+        if not self._idle:
+            return self._steal_hot()
+        return self._idle.pop() if self._use_lifo else self._idle.popleft()
+
+    def _can_open(self) -> bool:
+        """ Можно ли открыть ещё одно соединение, не превысив лимит. Вызывается под блокировкой пула """
+        return self._max_connections is None or self._opened < self._max_connections
+
+    def _release_reservation(self):
+        """
+        Освобождает место, зарезервированное под соединение, которое так и не было открыто или уже закрыто.
+        Если есть ожидающие потоки, место передаётся первому из них
+        """
+        with self._lock:
+            if self._waiters:
+                self._waiters.popleft().event.set()
+            else:
+                self._opened -= 1
+
+    def _reserve_connection(self):
+        """
+        Резервирует место под новое соединение, которое нельзя взять из простаивающих (например, транзакционное).
+        Если лимит исчерпан, место освобождается закрытием простаивающего соединения или ожидается
+        """
+        deadline = None if self._timeout is None else monotonic() + self._timeout
+        waiter = None
+        with self._lock:
+            if self._can_open():
+                self._opened += 1
+                return
+            connection = self._pop_idle()
+            if not connection:
+                waiter = _Waiter()
+                self._waiters.append(waiter)
+        if waiter:
+            connection = self._wait(waiter, deadline)
+        if connection:
+            # Место переходит от закрываемого соединения к новому
+            try:
+                self._close_connection(connection)
+            except Exception:
+                # Соединение уже разорвано - закрывать нечего
+                pass
+
+    def _open_pooled_connection(self, autocommit=True) -> Adapter:
+        """ Открывает новое соединение под уже сделанную резервацию или False, если СУБД отказала в подключении
         @return: Adapter | False
         """
         try:
-            return self._pool.get_nowait()
-        except Empty:
-            return False
+            connection = self._new_connection(autocommit)
+        except Exception:
+            self._release_reservation()
+            raise
+        if not connection:
+            self._release_reservation()
+        return connection
+
+    def _check_connection(self, db: Adapter) -> bool:
+        """ Можно ли выдать простаивавшее соединение. Устаревшее или мёртвое соединение закрывается """
+        expired = self._recycle is not None and monotonic() - db.connected_at >= self._recycle
+        if not expired and (not self._pre_ping or db.ping()):
+            return True
+        try:
+            self._close_connection(db)
+        except Exception:
+            # Соединение уже разорвано - закрывать нечего
+            pass
+        self._release_reservation()
+        return False
 
     def _get_connection(self) -> Adapter:
-        """ Берёт соединение из пула или открывает новое если пул пуст """
-        return self._connection_from_pool or self._new_connection()
+        """ Берёт соединение из пула, открывает новое если пул пуст или ждёт освобождения, если лимит исчерпан """
+        if self._use_hot_slots:
+            # Быстрый путь без блокировок: соединение, которое этот же поток только что вернул
+            try:
+                connection = self._hot_slot.pop()
+            except IndexError:
+                pass
+            else:
+                if self._check_connection(connection):
+                    return connection
+
+        deadline = None if self._timeout is None else monotonic() + self._timeout
+        while True:
+            waiter = None
+            with self._lock:
+                # Поток встаёт в очередь до проверки пула, чтобы вернувший соединение в свой слот поток
+                # либо увидел ожидающего и отдал соединение через пул, либо ожидающий сам нашёл его в слоте
+                if not self._can_open():
+                    waiter = _Waiter()
+                    self._waiters.append(waiter)
+                connection = self._pop_idle()
+                if connection:
+                    if waiter:
+                        self._waiters.remove(waiter)
+                elif not waiter:
+                    self._opened += 1
+
+            if waiter and not connection:
+                connection = self._wait(waiter, deadline)
+
+            if connection:
+                # Проверка может обращаться к серверу, поэтому выполняется вне блокировки
+                if self._check_connection(connection):
+                    return connection
+                continue
+
+            # Соединение открывается вне блокировки, чтобы не задерживать остальные потоки
+            connection = self._open_pooled_connection()
+            if connection:
+                return connection
+
+    def _wait(self, waiter: _Waiter, deadline: float=None):
+        """
+        Ждёт своей очереди. Возвращает переданное соединение или False, если передано право открыть новое
+        @return: Adapter | False
+        """
+        remaining = None if deadline is None else max(0, deadline - monotonic())
+        if not waiter.event.wait(remaining):
+            with self._lock:
+                if not waiter.event.is_set():
+                    self._waiters.remove(waiter)
+                    raise TooManyConnectionsError("no free connections in pool after %s seconds" % self._timeout)
+        return waiter.connection or False
+
+    def _has_idle_room(self) -> bool:
+        """ Можно ли оставить в пуле ещё одно простаивающее соединение. Вызывается под блокировкой пула """
+        return self._max_idle is None or len(self._idle) < self._max_idle
 
     def _return_connection(self, db: Adapter):
         """ Возвращает соединение в пул если оно ещё нужно иначе закрывает его """
-        self._pool.put(db)
+        if self._use_hot_slots:
+            # Быстрый путь без блокировок: соединение остаётся в слоте потока до следующего запроса
+            slot = self._hot_slot
+            if not slot and not self._waiters:
+                slot.append(db)
+                if not self._waiters:
+                    return
+                # Пока соединение клалось в слот, появился ожидающий поток - отдаём соединение через пул
+                try:
+                    db = slot.pop()
+                except IndexError:
+                    return
+        self._put_back(db)
+
+    def _put_back(self, db: Adapter):
+        """ Возвращает соединение в пул под блокировкой: отдаёт ожидающему, оставляет простаивать или закрывает """
+        with self._lock:
+            if self._waiters:
+                # Соединение передаётся первому в очереди напрямую, минуя пул
+                waiter = self._waiters.popleft()
+                waiter.connection = db
+                waiter.event.set()
+                return
+            if self._has_idle_room():
+                self._idle.append(db)
+                return
+        self._close_connection(db)
+        self._release_reservation()
+
+    def _preopen_connection(self, errors: list):
+        """ Открывает соединение под сделанную резервацию и кладёт его в пул, ошибку сохраняет в errors """
+        try:
+            connection = self._open_pooled_connection()
+        except Exception as err:
+            errors.append(err)
+            return
+        if connection:
+            self._return_connection(connection)
 
     def _preopen_connections(self):
-        """ Наполняет пул минимальным количеством соединений """
-        for i in range(self._min_connections):
-            self._return_connection(self._new_connection())
+        """ Наполняет пул минимальным количеством соединений. Соединения открываются параллельно """
+        with self._lock:
+            self._opened += self._min_connections
+        errors = []
+        threads = [Thread(target=self._preopen_connection, args=(errors,)) for i in range(self._min_connections)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            # Пул не будет создан, поэтому уже открытые соединения закрываются
+            self._close_idle_connections()
+            raise errors[0]
+
+    def _close_idle_connections(self):
+        """ Закрывает все простаивающие соединения пула """
+        while True:
+            with self._lock:
+                connection = self._pop_idle()
+            if not connection:
+                return
+            try:
+                self._close_connection(connection)
+            except Exception:
+                # Соединение уже разорвано - закрывать нечего
+                pass
+            self._release_reservation()
 
     @property
     def _local_tx_connection(self):
         if not hasattr(self._local, "tx_connection"):
-            self._local.tx_connection = self._new_connection(autocommit=False)
+            # Транзакционное соединение открывается отдельно, но учитывается в лимите соединений пула
+            self._reserve_connection()
+            self._local.tx_connection = self._open_pooled_connection(autocommit=False)
         return self._local.tx_connection
 
     @property
@@ -90,6 +384,12 @@ class Pool(object):
     def db(self):
         """ Освобождает соединение и возвращает в пул """
         if hasattr(self._local, "tx_connection"):
+            if self._local.tx_connection:
+                # Транзакционное соединение в пул не возвращается: оно закрывается и освобождает место
+                try:
+                    self._close_connection(self._local.tx_connection)
+                finally:
+                    self._release_reservation()
             del self._local.tx_connection
 
         if hasattr(self._local, "connection"):
@@ -103,7 +403,7 @@ class Pool(object):
     @property
     def size(self):
         """ Количество готовых соединений в пуле """
-        return self._pool.qsize()
+        return len(self._idle) + sum(len(slot) for slot in self._hot_slots)
 
     def __enter__(self):
         """ На входе получает из пула новое соединение и запоминает в локальной переменной потока """
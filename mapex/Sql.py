@@ -3,6 +3,7 @@
 """
 
 from abc import abstractmethod, ABCMeta
+from time import monotonic
 
 
 class PlaceHoldersCounter(object):
@@ -139,11 +140,11 @@ class SqlBuilder(object, metaclass=ABCMeta):
 
         """
 
-        if field.find(".") > -1:
+        if "." in field:
             path = field.split(".")
             field = path.pop()
             table = "_".join(path)
-        if field.find("+") > -1:
+        if "+" in field:
             return "%s as %s" % (
                 self.aggregate_function(self.concat_ws_function(field, table, "$!"), table, joins, conditions),
                 self.wrap_alias(field)
@@ -155,7 +156,7 @@ class SqlBuilder(object, metaclass=ABCMeta):
                 self.aggregate_function(self.field(field[0], table), table, joins, conditions),
                 self.wrap_alias(alias)
             )
-        return "%s.%s" % (self.wrap_table(table), self.wrap_field(field)) if table else "%s" % self.wrap_field(field)
+        return "%s.%s" % (self.wrap_table(table), self.wrap_field(field)) if table else self.wrap_field(field)
 
     def placeholder_controller(self, value, placeholders_counter: PlaceHoldersCounter) -> str:
         """
@@ -207,7 +208,7 @@ class SqlBuilder(object, metaclass=ABCMeta):
 
         """
         fname, ord_direction = order_cmd
-        if fname.find(".") > -1:
+        if "." in fname:
             table, fname = fname.split(".")
         return "%s.%s %s" % (self.wrap_table(table), self.wrap_field(fname), ord_direction.upper())
 
@@ -619,7 +620,7 @@ class SelectQuery(ConditionsMixin, JoinMixin, BaseSqlQuery):
         @rtype : str
 
         """
-        need_to_group = len(list(filter(lambda f: f.endswith("]"), self.fields))) > 0
+        need_to_group = any(f.endswith("]") for f in self.fields)
         if not need_to_group:
             return ""
 
@@ -915,9 +916,19 @@ class AdapterLogger(object):
 class Adapter(AdapterLogger, metaclass=ABCMeta):
     """ Базовый класс для создания адаптеров к СУБД """
 
+    # Максимальное количество параметров в одном запросе
+    max_query_params = 32767
+
+    # Максимальное количество строк в одном запросе INSERT ... VALUES (None - без ограничений)
+    max_insert_rows = None
+
+    # Сколько строк результата забирать у курсора за одно обращение
+    fetch_size = 1000
+
     def __init__(self):
         self.connection_data = (None,)
         self.connection = None
+        self.connected_at = None
         self.autocommit = True
         self.tx = None
         self.dublicate_record_exception = None
@@ -933,8 +944,20 @@ class Adapter(AdapterLogger, metaclass=ABCMeta):
         self.connection_data = connection_data
         self.autocommit = autocommit
         self.connection = self.open_connection(self.connection_data, self.autocommit)
+        self.connected_at = monotonic()
         return self if self.connection else False
 
+    def ping(self) -> bool:
+        """
+        Проверяет, что соединение с СУБД живо. Адаптеры переопределяют проверку более дешёвой, если драйвер позволяет
+        @return: bool
+        """
+        try:
+            self.execute_raw("SELECT 1")
+            return True
+        except Exception:
+            return False
+
     def reconnect(self):
         """ Выполняет переподключение к серверу базы данных """
         self.close()
@@ -1060,6 +1083,26 @@ class Adapter(AdapterLogger, metaclass=ABCMeta):
         res = self.get_value(*query.build())
         return res if primary_key and res not in ["DELETE", "INSERT", "UPDATE"] else 0
 
+    def insert_many_query(self, table_name, rows, primary_key, batch_size):
+        """
+        Выполняет вставку нескольких записей многострочными запросами INSERT ... VALUES (...), (...)
+        Все записи должны иметь одинаковый набор полей в одинаковом порядке
+        :param table_name:      Имя таблицы
+        :param rows:            Список словарей с данными для вставки
+        :param primary_key:     Первичный ключ таблицы
+        :param batch_size:      Максимальное количество записей в одном запросе
+        """
+        if not rows:
+            return
+        if self.max_insert_rows is not None:
+            batch_size = min(batch_size, self.max_insert_rows)
+        batch_size = max(1, min(batch_size, self.max_query_params // max(1, len(rows[0]))))
+        for start in range(0, len(rows), batch_size):
+            query = InsertQuery(self.query_builder)
+            query.set_table_name(table_name)
+            query.set_insert_data(rows[start:start + batch_size])
+            self.execute(*query.build())
+
     def update_query(self, table_name, data, conditions, params=None, joins=None, primary_key=None):
         """
         Выполняет запрос на обновление данных в таблице в соответствии с условиями
@@ -1158,6 +1201,23 @@ class Adapter(AdapterLogger, metaclass=ABCMeta):
         :return: :raise:    AdapterException
         """
 
+    @classmethod
+    def get_reverse_field_types_map(cls) -> dict:
+        """
+        Возвращает словарь соответствия типов полей СУБД типам полей маппера.
+        Строится один раз для класса адаптера по get_field_types_map()
+        :return: dict:      {тип поля в СУБД: тип поля маппера}
+        """
+        reverse_map = cls.__dict__.get("_reverse_field_types_map")
+        if reverse_map is None:
+            reverse_map = {}
+            field_types = cls.get_field_types_map()
+            for mapper_type in field_types:
+                for db_type in field_types[mapper_type]:
+                    reverse_map.setdefault(db_type, mapper_type)
+            cls._reverse_field_types_map = reverse_map
+        return reverse_map
+
     @abstractmethod
     def start_transaction(self):
         pass
@@ -1,5 +1,5 @@
 from collections import OrderedDict
-from itertools import filterfalse
+from itertools import filterfalse, islice
 
 
 def partition(predicate, iterable):
@@ -13,6 +13,20 @@ def partition(predicate, iterable):
     return filter(predicate, iterable), filterfalse(predicate, iterable)
 
 
+def chunks(iterable, size: int):
+    """
+    Разбивает iterable на списки длиной не более size
+    @param iterable: Итерируемая коллекция
+    @param size: Максимальная длина списка
+    @return: Генератор списков
+    """
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
 def do_dict(notation, value, cls=OrderedDict) -> dict:
     """
     Рекурсивно строит многомерный словарь по предоставленной точечной нотации
@@ -1,11 +1,33 @@
 __version__ = '0.1.2'
 
+from importlib import import_module
+
 from .Sql import Adapter as DatabaseClient
 from .Mappers import SqlMapper, NoSqlMapper
 from .Models import TableModel as CollectionModel, RecordModel as EntityModel, Transaction
 from .Models import EmbeddedObject, EmbeddedObjectFactory
-from .Exceptions import DublicateRecordException
+from .Exceptions import DublicateRecordException, DuplicateRecordException
 from .Pool import Pool
 
-from .Adapters import MySqlDbAdapter as MySqlClient, PgSqlDbAdapter as PgSqlClient, \
-    MsSqlDbAdapter as MsSqlClient, MongoDbAdapter as MongoClient
+# Адаптеры импортируются при первом обращении (PEP 562): модуль адаптеров требует драйвер MySQL уже при импорте,
+# а приложению обычно нужен только один из драйверов
+_lazy = {
+    "MySqlClient": (".Adapters", "MySqlDbAdapter"),
+    "PgSqlClient": (".Adapters", "PgSqlDbAdapter"),
+    "MsSqlClient": (".Adapters", "MsSqlDbAdapter"),
+    "MongoClient": (".Adapters", "MongoDbAdapter"),
+}
+
+__all__ = [
+    "DatabaseClient", "SqlMapper", "NoSqlMapper", "CollectionModel", "EntityModel", "Transaction",
+    "EmbeddedObject", "EmbeddedObjectFactory", "DublicateRecordException", "DuplicateRecordException", "Pool"
+] + list(_lazy)
+
+
+def __getattr__(name):
+    if name not in _lazy:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    module_name, attr = _lazy[name]
+    value = getattr(import_module(module_name, __name__), attr)
+    globals()[name] = value
+    return value
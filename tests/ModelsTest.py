@@ -6,16 +6,21 @@
 import sys
 import os
 import unittest
-from datetime import date
+from copy import copy
+from datetime import date, datetime, time
+from time import mktime
 
 from .framework.TestFramework import for_all_dbms, CustomProperty, CustomPropertyFactory, CustomPropertyPositive, \
     CustomPropertyNegative, DbMock, CustomPropertyWithNoneFactory, CustomPropertyWithoutNoneFactory, MyDbMock2
 
 from .framework.TestFramework import AModel, BModel, CModel, ACollection, BCollection, CCollection
 from .framework.TestFramework import MyDbMock
+from .QueryBuildersTest import RecordingAdapter
 
 from mapex.Exceptions import TableModelException, TableMapperException, \
     EmbeddedObjectFactoryException, DublicateRecordException
+from mapex.Models import TableModelCache
+from mapex.Mappers import SqlMapper, FieldTypesConverter, FieldValues, NoSqlMapper, get_match_pattern
 
 
 class TableModelTest(unittest.TestCase):
@@ -51,6 +56,26 @@ class TableModelTest(unittest.TestCase):
         self.assertEqual(0, users.count({"name": "InitalValue"}))
         self.assertEqual(1, users.count({"name": "NewValue"}))
 
+    @for_all_dbms
+    def test_delete_missing_record(self, dbms_fw: DbMock):
+        """ Удаление по значению первичного ключа несуществующей записи ничего не удаляет и возвращает None """
+        users = dbms_fw.get_new_users_collection_instance()
+        user = users.insert(dbms_fw.get_new_user_instance({"name": "first"}))
+        self.assertIsNone(users.delete({"uid": user.uid + 1}))
+        self.assertEqual(1, users.count())
+        users.delete({"uid": user.uid})
+        self.assertEqual(0, users.count())
+
+    @for_all_dbms
+    def test_update_missing_record(self, dbms_fw: DbMock):
+        """ Обновление по значению первичного ключа несуществующей записи не возвращает обновленных ключей """
+        users = dbms_fw.get_new_users_collection_instance()
+        user = users.insert(dbms_fw.get_new_user_instance({"name": "first"}))
+        self.assertEqual([], users.mapper.update({"name": "second"}, {"uid": user.uid + 1}))
+        self.assertEqual(1, users.count({"name": "first"}))
+        self.assertEqual([user.uid], users.mapper.update({"name": "second"}, {"uid": user.uid}))
+        self.assertEqual(1, users.count({"name": "second"}))
+
     @for_all_dbms
     def test_advanced_insert_behavior(self, dbms_fw: DbMock):
         """ Проверим также всю возможную логику при вставке данных """
@@ -191,6 +216,31 @@ class TableModelTest(unittest.TestCase):
         users.insert([user1, user2])
         self.assertEqual([user1, user2], list(users.generate_items(params={"order": ("age", "asc")})))
 
+    @for_all_dbms
+    def test_generate_items_pages(self, dbms_fw: DbMock):
+        """ Связанные модели загружаются и у моделей, страница которых уже пройдена генератором """
+        users = dbms_fw.get_new_users_collection_instance()
+        for i in range(5):
+            account = dbms_fw.get_new_account_instance()
+            account.email = "email%s@sss.ru" % i
+            account.save()
+            users.insert(dbms_fw.get_new_user_instance({"name": "user%s" % i, "age": i, "account": account}))
+        users.eager_loading_page = 2
+        items = list(users.generate_items(params={"order": ("age", "asc")}))
+        self.assertEqual(["email%s@sss.ru" % i for i in range(5)], [item.account.email for item in items])
+
+    @for_all_dbms
+    def test_get_items_with_properties(self, dbms_fw: DbMock):
+        """ Незапрошенные поля моделей загружаются при первом обращении к ним """
+        users = dbms_fw.get_new_users_collection_instance()
+        users.insert(dbms_fw.get_new_user_instance({"name": "FirstItem", "age": 1}))
+        item = users.get_items(properties=["name"])[0]
+        self.assertEqual("FirstItem", item.name)
+        self.assertEqual({"age"}, item._unloaded & {"age"})
+        self.assertEqual(1, item.age)
+        self.assertIsNone(item._unloaded)
+        self.assertFalse(item.is_changed())
+
     @for_all_dbms
     def test_params(self, dbms_fw: DbMock):
         """ Проверим сортировку и ограничение выборки """
@@ -1196,6 +1246,29 @@ class TableModelTest(unittest.TestCase):
             self.assertCountEqual([doc3.number, doc4.number], [d.number for d in user1.documents_not_ai])
             self.assertCountEqual([], [d.number for d in user2.documents_not_ai])
 
+    @for_all_dbms
+    def test_embedded_list_single_insert(self, dbms_fw: DbMock):
+        """ Элементы встроенного списка с неавтоинкрементным первичным ключом добавляются одним запросом """
+        documents = dbms_fw.get_new_documents_not_ai_instance()
+
+        if documents:
+            user = dbms_fw.get_new_user_instance({"name": "Vasya"})
+            user.save()
+            user.documents_not_ai = [
+                dbms_fw.get_new_document_not_ai_instance({"series": i, "number": i}) for i in range(1, 6)
+            ]
+            db = documents.mapper.pool.db
+            db.start_logging()
+            try:
+                user.save()
+                inserts = [sql for sql, params in db.query_analyzer.show() if "INSERT" in sql.upper()]
+            finally:
+                db.stop_logging()
+            self.assertEqual(1, len(inserts))
+            self.assertEqual(5, documents.count())
+            user.refresh()
+            self.assertCountEqual([1, 2, 3, 4, 5], [d.number for d in user.documents_not_ai])
+
     @for_all_dbms
     def test_query_with_embedded_lists(self, dbms_fw: DbMock):
         """ Проверим возможность работы с встроенным списком объектов """
@@ -2256,6 +2329,276 @@ class EmbeddedObjectsFactoryUnittests(unittest.TestCase):
         self.assertRaises(EmbeddedObjectFactoryException, CustomPropertyWithoutNoneFactory, 3)
 
 
+class Stub(object):
+    """ Заглушка с произвольным набором атрибутов для юниттестов без базы данных """
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
+
+
+class TableModelCacheUnittests(unittest.TestCase):
+    """ Юниттесты TableModelCache """
+
+    @staticmethod
+    def get_mapper(max_query_params, batch_fetch_size=None):
+        """ Заглушка маппера, коллекция которого запоминает условия каждого запроса """
+        queries = []
+        mapper = Stub(
+            batch_fetch_size=batch_fetch_size,
+            primary=Stub(compound=False, name=lambda: "id")
+        )
+        item = lambda key: Stub(
+            primary=Stub(get_value=lambda deep=False: key), get_data=lambda: {"id": key}
+        )
+        collection = Stub(
+            mapper=mapper,
+            pool=Stub(db=Stub(max_query_params=max_query_params), in_transaction=False),
+            get_items=lambda bounds: queries.append(bounds) or [item(key) for key in bounds["id"][1]]
+        )
+        mapper.get_new_collection = lambda model_pool=None: collection
+        return mapper, queries
+
+    def test_batch_fetch_queries(self):
+        """ Связанные модели загружаются одним запросом, если их ключи помещаются в ограничение адаптера """
+        mapper, queries = self.get_mapper(max_query_params=2100)
+        cache = TableModelCache(mapper)
+        cache.cache_primaries(mapper, list(range(100)))
+        self.assertEqual({"id": 5}, cache.get(mapper, 5))
+        self.assertEqual({"id": 99}, cache.get(mapper, 99))
+        self.assertEqual(1, len(queries))
+
+        # Ключи сверх ограничения адаптера делятся на пачки
+        mapper, queries = self.get_mapper(max_query_params=40)
+        cache = TableModelCache(mapper)
+        cache.cache_primaries(mapper, list(range(100)))
+        self.assertEqual({"id": 99}, cache.get(mapper, 99))
+        self.assertEqual(3, len(queries))
+
+        # Явно заданный batch_fetch_size ограничивает размер пачки
+        mapper, queries = self.get_mapper(max_query_params=2100, batch_fetch_size=32)
+        cache = TableModelCache(mapper)
+        cache.cache_primaries(mapper, list(range(100)))
+        self.assertEqual({"id": 0}, cache.get(mapper, 0))
+        self.assertEqual(4, len(queries))
+
+    def test_clear(self):
+        """ После очистки кэш не хранит ни загруженных данных, ни накопленных ключей """
+        mapper, queries = self.get_mapper(max_query_params=2100)
+        cache = TableModelCache(mapper)
+        cache.cache_primaries(mapper, [1, 2])
+        self.assertEqual({"id": 1}, cache.get(mapper, 1))
+        cache.cache_primaries(mapper, [3])
+        cache.clear()
+        self.assertIsNone(cache.get(mapper, 1))
+        self.assertIsNone(cache.get(mapper, 3))
+        self.assertEqual(1, len(queries))
+
+        cache.cache_primaries(mapper, [4])
+        self.assertEqual({"id": 4}, cache.get(mapper, 4))
+        self.assertEqual(2, len(queries))
+
+
+class SqlMapperUnittests(unittest.TestCase):
+    """ Юниттесты маппера, работающего через адаптер, который только запоминает запросы """
+
+    @staticmethod
+    def get_mapper(db, set_primary=False):
+        """ Маппер таблицы mainTable, работающий через адаптер db """
+        class Pool(object):
+            pass
+
+        class Mapper(SqlMapper):
+            def bind(self):
+                self.set_new_item(None)
+                self.set_collection_name("mainTable")
+                self.set_map([self.int("id", "ID"), self.str("name", "Name")])
+                if set_primary:
+                    self.set_primary("id")
+
+        Pool.db = db
+        Mapper.pool = Pool()
+        return Mapper()
+
+    def test_insert_many_keeps_order(self):
+        """ Записи с разными наборами полей вставляются в порядке следования в списке """
+        db = RecordingAdapter()
+        items = [{"id": 1, "name": "a"}, {"id": 2}, {"id": 3, "name": "c"}, {"id": 4, "name": "d"}]
+        self.assertEqual([1, 2, 3, 4], self.get_mapper(db, set_primary=True).insert_many(items))
+        self.assertEqual([[1, "a"], [2], [3, "c", 4, "d"]], db.queries)
+
+    def test_insert_many_primary_from_schema(self):
+        """ Первичный ключ, найденный по схеме таблицы, не мешает многострочной вставке, если его не генерирует СУБД """
+        db = RecordingAdapter()
+        items = [{"id": i, "name": "name%s" % i} for i in range(1, 6)]
+        self.assertEqual([1, 2, 3, 4, 5], self.get_mapper(db).insert_many(items))
+        self.assertEqual(1, len(db.queries))
+
+        # Автоинкрементный ключ нужно прочитать после каждой вставки
+        db = RecordingAdapter(autoincremented=True)
+        self.get_mapper(db).insert_many([{"name": "name%s" % i} for i in range(1, 6)])
+        self.assertEqual(5, len(db.queries))
+
+        # Как и ключ, значение которого у записи не задано
+        db = RecordingAdapter()
+        self.get_mapper(db).insert_many([{"id": 1, "name": "a"}, {"name": "b"}])
+        self.assertEqual(2, len(db.queries))
+
+    def test_insert_list(self):
+        """ Список записей, переданный в insert(), вставляется многострочным запросом """
+        db = RecordingAdapter()
+        items = [{"id": i, "name": "name%s" % i} for i in range(1, 4)]
+        self.assertEqual([1, 2, 3], self.get_mapper(db).insert(items))
+        self.assertEqual([[1, "name1", 2, "name2", 3, "name3"]], db.queries)
+
+    def test_delete_without_dependencies(self):
+        """ Если от записей не зависят записи списков, удаление выполняется одним запросом, без выборки ключей """
+        db = RecordingAdapter()
+        mapper = self.get_mapper(db)
+        self.assertIsNone(mapper.delete({"id": 5}))
+        self.assertIsNone(mapper.delete({"name": "a"}))
+        self.assertEqual(["DELETE", "DELETE"], db.statements)
+        self.assertEqual([[5], ["a"]], db.queries)
+
+    def test_update_without_ids(self):
+        """ Если ключи обновленных записей не нужны, обновление выполняется одним запросом, без выборки ключей """
+        db = RecordingAdapter()
+        mapper = self.get_mapper(db)
+        self.assertIsNone(mapper.update({"name": "b"}, {"name": "a"}, return_ids=False))
+        self.assertEqual(["UPDATE"], db.statements)
+        self.assertEqual([["b", "a"]], db.queries)
+
+
+class FieldTypesConverterUnittests(unittest.TestCase):
+    """ Юниттесты конвертеров значений полей """
+
+    def test_str2date(self):
+        """ Строки дат разбираются быстрым путем только из ASCII-цифр, остальные - как и раньше, через strptime """
+        self.assertEqual(date(2015, 3, 7), FieldTypesConverter.str2date("2015-03-07"))
+        self.assertEqual(date(2015, 3, 7), FieldTypesConverter.str2date("2015-3-7"))
+        for value in ["2015-+3-07", "2015- 3-07", "2015-03-\u0660\u0667", "2015-02-30", "2015/03/07"]:
+            self.assertRaises(ValueError, FieldTypesConverter.str2date, value)
+
+    def test_str2datetime(self):
+        """ Строки даты и времени разбираются быстрым путем только из ASCII-цифр """
+        self.assertEqual(datetime(2015, 3, 7, 1, 2, 3), FieldTypesConverter.str2datetime("2015-03-07 01:02:03"))
+        self.assertEqual(datetime(2015, 3, 7, 1, 2, 3), FieldTypesConverter.str2datetime("2015-03-07 1:2:3"))
+        for value in ["2015-03-07 +1:02:03", "2015-03-07 01:02: 3", "2015-03-07 01:02:\u0660\u0663"]:
+            self.assertRaises(ValueError, FieldTypesConverter.str2datetime, value)
+
+    def test_str2time(self):
+        """ Строки времени разбираются быстрым путем только из ASCII-цифр """
+        self.assertEqual(time(1, 2, 3), FieldTypesConverter.str2time("01:02:03"))
+        self.assertEqual(time(1, 2, 3), FieldTypesConverter.str2time("1:2:3"))
+        for value in ["+1:02:03", "01: 2:03", "01:02:\u0660\u0663", "25:00:00"]:
+            self.assertRaises(ValueError, FieldTypesConverter.str2time, value)
+
+    def test_date2int(self):
+        """ Даты и время переводятся в целое число секунд так же, как через time.mktime """
+        for value in [date(2015, 3, 7), date(1970, 1, 2), date(2038, 6, 1)]:
+            expected = int(mktime(value.timetuple()))
+            self.assertIs(int, type(FieldTypesConverter.date2int(value)))
+            self.assertEqual(expected, FieldTypesConverter.date2int(value))
+        for value in [datetime(2015, 3, 7, 1, 2, 3), datetime(2015, 3, 7, 1, 2, 3, 999999), datetime(1970, 1, 2)]:
+            expected = int(mktime(value.timetuple()))
+            self.assertIs(int, type(FieldTypesConverter.datetime2int(value)))
+            self.assertEqual(expected, FieldTypesConverter.datetime2int(value))
+
+
+class ListValueUnittests(unittest.TestCase):
+    """ Юниттесты отслеживания изменений списков объектов моделей """
+
+    def test_is_changed(self):
+        """ Список считается измененным, если его элементы отличаются от исходных """
+        first, second, third = object(), object(), object()
+        items = FieldValues.ListValue([first, second])
+        self.assertFalse(items.is_changed())
+
+        items.append(third)
+        self.assertTrue(items.is_changed())
+        items.pop()
+        self.assertFalse(items.is_changed())
+
+        # Замена элемента на месте не меняет длину списка, но изменение замечается
+        items[0] = third
+        self.assertTrue(items.is_changed())
+        items[0] = first
+        self.assertFalse(items.is_changed())
+
+        items += [third]
+        self.assertIsInstance(items, FieldValues.ListValue)
+        self.assertTrue(items.is_changed())
+
+    def test_mark_changed(self):
+        """ Изменение, которого не видно по элементам, отмечается явно и сохраняется в копии списка """
+        items = FieldValues.ListValue([object()])
+        items.mark_changed()
+        self.assertTrue(items.is_changed())
+        self.assertTrue(copy(items).is_changed())
+        self.assertFalse(copy(FieldValues.ListValue([object()])).is_changed())
+
+
+class MongoConditionsUnittests(unittest.TestCase):
+    """ Юниттесты перевода условий в формат mongodb """
+
+    def test_match_pattern(self):
+        """ Выражения для шаблонов match кэшируются, * в шаблоне означает любую последовательность символов """
+        pattern = get_match_pattern("ab*")
+        self.assertIs(pattern, get_match_pattern("ab*"))
+        self.assertEqual("^ab.*$", pattern.pattern)
+        self.assertTrue(pattern.match("ab"))
+        self.assertTrue(pattern.match("abcd"))
+        self.assertFalse(pattern.match("xab"))
+
+    def test_to_mongo_conditions_format(self):
+        """ Исходные условия не изменяются при переводе и могут использоваться повторно """
+        conditions = {"age": ("gt", 18), "name": ("match", "a*"), "or": [{"uid": ("in", [1, 2])}, {"uid": 3}]}
+        original = {"age": ("gt", 18), "name": ("match", "a*"), "or": [{"uid": ("in", [1, 2])}, {"uid": 3}]}
+        expected = {"age": {"$gt": 18}, "name": get_match_pattern("a*"), "$or": [{"uid": {"$in": [1, 2]}}, {"uid": 3}]}
+        self.assertEqual(expected, NoSqlMapper.to_mongo_conditions_format(conditions))
+        self.assertEqual(original, conditions)
+        self.assertEqual(expected, NoSqlMapper.to_mongo_conditions_format(conditions))
+
+    def test_exists_conditions_format(self):
+        """ Условие exists переводится в проверку на неравенство None, как и раньше, независимо от флага """
+        self.assertEqual({"name": {"$ne": None}}, NoSqlMapper.to_mongo_conditions_format({"name": ("exists", True)}))
+        self.assertEqual({"name": {"$ne": None}}, NoSqlMapper.to_mongo_conditions_format({"name": ("exists", False)}))
+
+    def test_relations_ids_intersection(self):
+        """ Условия на несколько списков связей, ограничивающих одни и те же записи, пересекаются """
+        found = {
+            "tags": [{"user": 1}, {"user": 2}, {"user": 2}, {"user": 3}],
+            "statuses": [{"user": 3}, {"user": 4}, {"user": 2}]
+        }
+        queries = []
+
+        def get_relation(table_name):
+            def select_query(table, fields, conditions):
+                queries.append((table, fields, conditions))
+                return iter(found[table])
+            fmapper = Stub(
+                table_name=table_name, pool=Stub(db=Stub(select_query=select_query)),
+                translate=lambda name, direction: name,
+                get_property_that_is_link_for=lambda mapper: Stub(get_db_name=lambda: "user")
+            )
+            return Stub(get_items_collection_mapper=lambda: fmapper)
+
+        relations = {"tags": get_relation("tags"), "statuses": get_relation("statuses")}
+        mapper = Stub(
+            get_property_by_db_name=relations.get, is_real_embedded=lambda mf: False, is_rel=lambda mf: True,
+            is_list_with_dependencies=lambda mf: True, to_mongo_conditions_format=NoSqlMapper.to_mongo_conditions_format
+        )
+        conditions = {"name": "x", "tags.name": "a", "tags.weight": ("gt", 1), "statuses.code": 5}
+        converted = NoSqlMapper.convert_conditions_to_one_collection(mapper, conditions)
+        self.assertEqual(["_id", "name"], sorted(converted))
+        self.assertEqual("x", converted["name"])
+        self.assertEqual("in", converted["_id"][0])
+        self.assertEqual([2, 3], sorted(converted["_id"][1]))
+        # На каждую связанную коллекцию - один запрос со всеми условиями на нее
+        self.assertEqual(
+            [("tags", ["user"], {"name": "a", "weight": {"$gt": 1}}), ("statuses", ["user"], {"code": 5})],
+            queries
+        )
+
+
 class TransactionTests(unittest.TestCase):
     @for_all_dbms
     def test_empty_commit(self, dbms_fw: DbMock):
@@ -1,8 +1,8 @@
 from unittest import TestCase
 from mapex.Pool import Pool, TooManyConnectionsError
-from time import time
+from time import time, sleep, monotonic
 from .framework.TestFramework import for_all_dbms, DbMock, MsDbMock
-from threading import Timer
+from threading import Timer, Thread, Barrier
 
 
 class PoolTestCase(TestCase):
@@ -54,3 +54,151 @@ class PoolTestCase(TestCase):
         # При удалении соединения оно возвращается в пул
         del dbms_fw.pool.db
         self.assertEqual(2, dbms_fw.pool.size)
+
+    @for_all_dbms
+    def test_max_connections(self, dbms_fw: DbMock):
+        """ При исчерпании лимита соединений пул ждёт освобождения соединения, а по таймауту бросает исключение """
+        pool = Pool(adapter=dbms_fw.get_adapter(), dsn=dbms_fw.get_dsn(), min_connections=1, max_connections=2,
+                    timeout=0.5)
+        with pool:
+            db = pool._get_connection()
+            start = time()
+            with self.assertRaises(TooManyConnectionsError):
+                with pool:
+                    pass
+            self.assertGreaterEqual(time() - start, 0.5)
+
+            # Соединение, освобождённое другим потоком, сразу же отдаётся ожидающему
+            Timer(0.1, pool._return_connection, [db]).start()
+            with pool as connection:
+                self.assertIs(db, connection)
+        self.assertEqual(2, pool.size)
+
+    @for_all_dbms
+    def test_lifo(self, dbms_fw: DbMock):
+        """ По умолчанию пул первым выдаёт последнее возвращённое в него соединение """
+        pool = Pool(adapter=dbms_fw.get_adapter(), dsn=dbms_fw.get_dsn(), min_connections=2)
+        with pool as first:
+            pass
+        with pool as second:
+            self.assertIs(first, second)
+
+        pool = Pool(adapter=dbms_fw.get_adapter(), dsn=dbms_fw.get_dsn(), min_connections=2, use_lifo=False)
+        with pool as first:
+            pass
+        with pool as second:
+            self.assertIsNot(first, second)
+
+    @for_all_dbms
+    def test_max_idle(self, dbms_fw: DbMock):
+        """ Соединения сверх max_idle закрываются при возврате в пул """
+        pool = Pool(adapter=dbms_fw.get_adapter(), dsn=dbms_fw.get_dsn(), min_connections=1, max_idle=1)
+        with pool:
+            with pool:
+                pass
+        self.assertEqual(1, pool.size)
+
+    @for_all_dbms
+    def test_recycle(self, dbms_fw: DbMock):
+        """ Соединение старше recycle секунд не выдаётся, а заменяется новым """
+        pool = Pool(adapter=dbms_fw.get_adapter(), dsn=dbms_fw.get_dsn(), min_connections=1, recycle=0.1,
+                    pre_ping=True)
+        with pool as db:
+            connected_at = db.connected_at
+        sleep(0.2)
+        with pool as db:
+            self.assertGreater(db.connected_at, connected_at)
+            self.assertTrue(db.ping())
+        self.assertEqual(1, pool.size)
+
+
+class FakeAdapter(object):
+    """ Адаптер-заглушка: соединение не открывается на самом деле """
+    def connect(self, dsn, autocommit=True):
+        self.connected_at = monotonic()
+        return self
+
+    def close(self):
+        pass
+
+    def stop_logging(self):
+        pass
+
+    def ping(self):
+        return True
+
+
+class FailingAdapter(FakeAdapter):
+    """ Адаптер-заглушка, который не может открыть второе соединение и считает закрытые """
+    connects = 0
+    closed = 0
+
+    def connect(self, dsn, autocommit=True):
+        FailingAdapter.connects += 1
+        if FailingAdapter.connects == 2:
+            raise ConnectionError("connection refused")
+        return super().connect(dsn, autocommit)
+
+    def close(self):
+        FailingAdapter.closed += 1
+
+
+class PoolUnittests(TestCase):
+    def test_hot_slot_of_finished_thread(self):
+        """ Слот завершившегося потока удаляется из пула, а оставленное в нём соединение возвращается в пул """
+        pool = Pool(adapter=FakeAdapter, dsn=("fake",), min_connections=1)
+
+        def work():
+            with pool:
+                pass
+
+        threads = [Thread(target=work) for i in range(5)]
+        for thread in threads:
+            thread.start()
+            thread.join()
+        self.assertEqual((), pool._hot_slots)
+        self.assertEqual(1, pool.size)
+        self.assertEqual(1, len(pool._idle))
+
+    def test_max_idle_concurrent(self):
+        """ Потоки, одновременно возвращающие соединения, не превышают max_idle """
+        pool = Pool(adapter=FakeAdapter, dsn=("fake",), min_connections=1, max_idle=2)
+        barrier = Barrier(8)
+
+        def work():
+            with pool:
+                barrier.wait()
+
+        threads = [Thread(target=work) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(2, pool.size)
+        self.assertEqual(2, pool._opened)
+
+    def test_tx_connection_counted(self):
+        """ Транзакционное соединение учитывается в лимите соединений и освобождает место при удалении """
+        pool = Pool(adapter=FakeAdapter, dsn=("fake",), min_connections=1, max_connections=1, timeout=0.1)
+        pool.in_transaction = True
+        self.assertTrue(pool.db)
+        # Место заняло транзакционное соединение, простаивавшее соединение закрыто
+        self.assertEqual(0, pool.size)
+        self.assertEqual(1, pool._opened)
+        pool.in_transaction = False
+        with self.assertRaises(TooManyConnectionsError):
+            with pool:
+                pass
+        del pool.db
+        self.assertEqual(0, pool._opened)
+        with pool:
+            pass
+        self.assertEqual(1, pool._opened)
+
+    def test_preopen_failure_closes_connections(self):
+        """ Если одно из начальных соединений не открылось, уже открытые соединения закрываются """
+        FailingAdapter.connects = FailingAdapter.closed = 0
+        with self.assertRaises(ConnectionError):
+            Pool(adapter=FailingAdapter, dsn=("fake",), min_connections=3)
+        self.assertEqual(3, FailingAdapter.connects)
+        self.assertEqual(2, FailingAdapter.closed)
@@ -5,8 +5,8 @@ import re
 from collections import OrderedDict
 from mapex.QueryBuilders import PgSqlBuilder, MySqlBuilder, MsSqlBuilder,  \
     SelectQuery, DeleteQuery, InsertQuery, UpdateQuery
-from mapex.Sql import PlaceHoldersCounter
-from mapex.Mappers import Join
+from mapex.Sql import PlaceHoldersCounter, Adapter, MsSqlDbField
+from mapex.Mappers import Join, FieldTypes
 
 
 class QueryBuildersTest(unittest.TestCase):
@@ -402,5 +402,72 @@ class QueryBuildersTest(unittest.TestCase):
         )
 
 
+
+class RecordingAdapter(Adapter):
+    """ Адаптер с ограничениями MSSQL, который не подключается к серверу, а запоминает параметры запросов """
+    max_query_params = 2100
+    max_insert_rows = 1000
+
+    def __init__(self, autoincremented=False):
+        super().__init__()
+        self.autoincremented = autoincremented
+        self.queries = []
+        self.statements = []
+
+    def get_query_builder(self):
+        return MsSqlBuilder()
+
+    def execute_query(self, sql, params=None):
+        self.statements.append(sql.split()[0].upper())
+        self.queries.append(params)
+        return []
+
+    def get_table_fields(self, table_name):
+        return {
+            "ID": MsSqlDbField("ID", "NO", "int", None, None, "ID", int(self.autoincremented)),
+            "Name": MsSqlDbField("Name", "YES", "nvarchar", 50, None, None, 0)
+        }, "ID"
+
+    @staticmethod
+    def get_field_types_map():
+        return {FieldTypes.Int: ["int"], FieldTypes.String: ["nvarchar"]}
+
+    def open_connection(self, connection_data, autocommit=True):
+        pass
+
+    def close_connection(self):
+        pass
+
+    def execute_raw(self, sql):
+        pass
+
+    def start_transaction(self):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class InsertManyTest(unittest.TestCase):
+    """ Модульные тесты многострочной вставки записей """
+
+    def test_insert_many_query_limits(self):
+        """ Запросы делятся так, чтобы не превысить ни количество строк, ни количество параметров в запросе """
+        db = RecordingAdapter()
+        db.insert_many_query("mainTable", [{"ID": i} for i in range(2500)], None, 5000)
+        self.assertEqual([1000, 1000, 500], [len(params) for params in db.queries])
+
+        db = RecordingAdapter()
+        db.insert_many_query("mainTable", [{"ID": i, "Name": i, "Age": i} for i in range(2500)], None, 5000)
+        self.assertEqual([2100, 2100, 2100, 1200], [len(params) for params in db.queries])
+
+        db = RecordingAdapter()
+        db.insert_many_query("mainTable", [{"ID": i} for i in range(250)], None, 100)
+        self.assertEqual([100, 100, 50], [len(params) for params in db.queries])
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file